@@ -30,11 +30,14 @@ from src.discord.globals import (
     CHANNEL_RULES,
 )
 from src.discord.reporter import Reporter
+from src.features import MessageFeatures
 from src.mongo.mongo import MongoDatabase
+from src.regexpool import RegexPool
 
 if TYPE_CHECKING:
     from src.discord.censor import Censor
     from src.discord.logger import Logger
+    from src.discord.ping import PingManager
     from src.discord.spam import SpamManager
 
 intents = discord.Intents.all()
@@ -134,6 +137,7 @@ class PiBot(commands.Bot):
 
     session: aiohttp.ClientSession | None
     mongo_database: MongoDatabase
+    regex_pool: RegexPool
     settings: ClassVar[dict[str, str | int | None]] = {
         "_id": None,
         "custom_bot_status_type": None,
@@ -157,6 +161,7 @@ class PiBot(commands.Bot):
         self.__commit__ = self.get_commit()
         self.session = None
         self.mongo_database = MongoDatabase(self)
+        self.regex_pool = RegexPool()
 
     def get_commit(self) -> str | None:
         with subprocess.Popen(
@@ -173,6 +178,8 @@ class PiBot(commands.Bot):
         Called when the bot is being setup. Currently sets up a connection to the
         database and initializes all extensions.
         """
+        await self.regex_pool.start()
+
         extensions = (
             "src.discord.censor",
             "src.discord.ping",
@@ -188,6 +195,7 @@ class PiBot(commands.Bot):
             "src.discord.funcommands",
             "src.discord.tasks",
             "src.discord.spam",
+            "src.discord.raid",
             "src.discord.reporter",
             "src.discord.logger",
         )
@@ -200,14 +208,13 @@ class PiBot(commands.Bot):
                 traceback.print_exc()
 
     async def update_setting(self, values: dict[str, Any]):
-        for k, v in values.items():
-            self.settings[k] = v
-            await self.mongo_database.update(
-                "data",
-                "settings",
-                self.settings["_id"],
-                {"$set": values},
-            )
+        self.settings.update(values)
+        await self.mongo_database.update(
+            "data",
+            "settings",
+            self.settings["_id"],
+            {"$set": values},
+        )
 
     async def on_ready(self) -> None:
         """
@@ -273,13 +280,38 @@ class PiBot(commands.Bot):
             discord.DMChannel | discord.GroupChannel,
         )
 
-        if message.content and not is_private:
+        # Normalize and scan the content once for the censor, spam and ping systems
+        features = MessageFeatures.build(message.content)
+
+        # Each system handles the message on its own, so an error in one (such as
+        # a member with closed direct messages) does not stop the others
+        censored = False
+        if (message.content or message.attachments) and not is_private:
             censor: commands.Cog | Censor = self.get_cog("Censor")
-            await censor.on_message(message)
+            try:
+                censored = await censor.on_message(message, features)
+            except Exception:
+                # The message may have been removed before the error
+                censored = True
+                logger.exception("Error while censoring message:")
 
+        if message.content and not is_private:
             # Check to see if the message contains repeated content or has too many caps
             spam: commands.Cog | SpamManager = self.get_cog("SpamManager")
-            await spam.store_and_validate(message)
+            try:
+                await spam.store_and_validate(message, features)
+            except Exception:
+                logger.exception("Error while checking message for spam:")
+
+        # Censored messages must not send out pings, as the features were built
+        # from the content before it was censored
+        if not is_private and not censored:
+            # Send out ping alerts to users with matching pings
+            ping: commands.Cog | PingManager = self.get_cog("ping")
+            try:
+                await ping.on_message(message, features)
+            except Exception:
+                logger.exception("Error while sending ping alerts for message:")
 
         if message.content and len(re.findall(r"^[!\?]\s*\w+$", message.content)):
             botspam_channel = discord.utils.get(
@@ -301,6 +333,8 @@ class PiBot(commands.Bot):
     async def close(self) -> None:
         if self.session:
             await self.session.close()
+        await self.regex_pool.close()
+        await self.mongo_database.close()
         await super().close()
 
     async def listen_for_response(
@@ -5,11 +5,16 @@ server.
 from __future__ import annotations
 
 import asyncio
+import collections
+import concurrent.futures
 import contextlib
+import functools
+import hashlib
 import logging
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, TypedDict
 
+import aiohttp
 import discord
 from discord.ext import commands
 
@@ -20,30 +25,371 @@ from src.discord.globals import (
     DISCORD_INVITE_ENDINGS,
     ROLE_UC,
 )
+from src.features import MessageFeatures, normalize
+from src.links import Link, domain_blocked, invite_code
+from src.perceptualhash import BKTree, dhash
+from src.regexpool import RegexPoolBusy, RegexPoolError
+from src.store import Report
 
 if TYPE_CHECKING:
     from bot import PiBot
 
+    from .raid import RaidManager
     from .reporter import Reporter
 
 logger = logging.getLogger(__name__)
 
+CENSOR_WEBHOOK_NAME = "Censor (Automated)"
+
+
+class CensorBacktest(TypedDict):
+    """
+    The result of running a proposed censor word against recent messages.
+    """
+
+    corpus_size: int
+    hits: int
+    samples: list[str]
+    p50_ns: int
+    p99_ns: int
+
+
+class CensorMatcher:
+    """
+    A single compiled expression covering every word and emoji on the censor list.
+
+    Content is scanned once for all entries, rather than once per entry. The
+    expression is only recompiled when :meth:`rebuild` is called, which should
+    happen whenever the censor list changes. The compiled expression is evaluated
+    in the bot's regex pool.
+    """
+
+    pattern: re.Pattern[str] | None
+    words: list[str]  # The words in the expression, in the order they are tried
+    version: int
+
+    def __init__(self):
+        self.pattern = None
+        self.words = []
+        self.version = 0
+
+    @staticmethod
+    def compile(words: list[str], emojis: list[str]) -> re.Pattern[str] | None:
+        """
+        Compiles a single expression matching any of the given words or emojis.
+
+        Raises:
+            re.error: The words cannot be combined into one expression, such as
+                when two words use the same group name.
+        """
+        alternatives = []
+        if words:
+            group = "|".join(f"(?:{word})" for word in words)
+            alternatives.append(rf"\b(?:{group})\b")
+        alternatives.extend(
+            re.escape(emoji) for emoji in sorted(emojis, key=len, reverse=True)
+        )
+        return re.compile("|".join(alternatives), re.I) if alternatives else None
+
+    def conflict(self, word: str) -> str | None:
+        """
+        Returns why a valid word cannot be combined with the words already in the
+        matcher, or None if it can be.
+        """
+        try:
+            self.compile([*self.words, word], [])
+        except re.error as e:
+            return str(e)
+        return None
+
+    def rebuild(self, words: list[str], emojis: list[str]) -> None:
+        """
+        Recompiles the matcher from the given censor list.
+
+        Words are treated as regular expressions which must match on word
+        boundaries, while emojis are matched literally. Words which are not valid
+        regular expressions, or which cannot be combined with the other words, are
+        skipped so that one bad entry does not disable the entire censor.
+
+        Args:
+            words: The words on the censor list.
+            emojis: The emojis on the censor list.
+        """
+        valid_words = []
+        # Try longer words first so that the longest phrase is the one replaced
+        for word in sorted(words, key=len, reverse=True):
+            try:
+                re.compile(rf"\b({word})\b")
+            except re.error as e:
+                logger.warning(f"Skipping invalid censor word {word!r}: {e}")
+                continue
+            valid_words.append(word)
+
+        try:
+            self.pattern = self.compile(valid_words, emojis)
+        except re.error as e:
+            # Only search for the conflicting words when there are any, as
+            # compiling once per word is slow
+            logger.warning(f"Censor words cannot be combined ({e}), checking each")
+            self.words = []
+            for word in valid_words:
+                conflict = self.conflict(word)
+                if conflict:
+                    logger.warning(
+                        f"Skipping conflicting censor word {word!r}: {conflict}",
+                    )
+                    continue
+                self.words.append(word)
+            valid_words = self.words
+            self.pattern = self.compile(valid_words, emojis)
+        self.words = valid_words
+        self.version += 1
+        logger.debug(
+            f"Rebuilt censor matcher (version {self.version}) with "
+            f"{len(valid_words)} words and {len(emojis)} emojis.",
+        )
+
+
+class CensorCache:
+    """
+    A bounded least-recently-used cache of censor results.
+
+    Entries are keyed by the kind of result, a hash of the content and the version
+    of the censor matcher which produced the result. Because the version changes
+    whenever the censor list changes, results from an older censor list are never
+    returned, and simply fall out of the cache over time.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: collections.OrderedDict[
+            tuple[str, bytes, int],
+            bool | str,
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(kind: str, content: str, version: int) -> tuple[str, bytes, int]:
+        """
+        Builds the cache key for a result. Results are keyed on the exact
+        content they were computed from, as censor words are regular expressions
+        which may depend on case or whitespace.
+
+        Args:
+            kind: Either "verdict" or "censored".
+            content: The content the result is for.
+            version: The version of the censor matcher.
+        """
+        digest = hashlib.blake2b(content.encode(), digest_size=16).digest()
+        return (kind, digest, version)
+
+    def get(self, kind: str, content: str, version: int) -> bool | str | None:
+        """
+        Returns a cached result, or None if no result is cached.
+        """
+        key = self.key(kind, content, version)
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, kind: str, content: str, version: int, result: bool | str) -> None:
+        """
+        Stores a result, evicting the least recently used result if needed.
+        """
+        key = self.key(kind, content, version)
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class CensorWebhookPool:
+    """
+    Keeps one reusable censor webhook for each channel, so that reposting a
+    censored message only costs a single webhook execution.
+
+    Webhooks are cached in memory and stored in the database, and are only
+    recreated when Discord reports that the stored webhook no longer exists.
+    """
+
+    webhooks: dict[int, discord.Webhook]
+
+    def __init__(self, bot: PiBot):
+        self.bot = bot
+        self.webhooks = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def _load(self) -> None:
+        """
+        Loads all previously stored censor webhooks from the database.
+        """
+        for doc in await self.bot.mongo_database.get_webhooks():
+            self.webhooks[doc["channel_id"]] = discord.Webhook.from_url(
+                doc["url"],
+                client=self.bot,
+            )
+        self._loaded = True
+
+    async def get(self, channel: discord.TextChannel) -> discord.Webhook:
+        """
+        Gets the censor webhook for a channel, creating one if needed.
+
+        Args:
+            channel: The channel to get the webhook for.
+        """
+        async with self._lock:
+            if not self._loaded:
+                await self._load()
+
+            if channel.id in self.webhooks:
+                return self.webhooks[channel.id]
+
+            # Reuse a censor webhook left behind in the channel, if one exists
+            webhook = discord.utils.find(
+                lambda w: w.name == CENSOR_WEBHOOK_NAME and w.user == self.bot.user,
+                await channel.webhooks(),
+            )
+            if webhook is None:
+                webhook = await channel.create_webhook(name=CENSOR_WEBHOOK_NAME)
+
+            self.webhooks[channel.id] = webhook
+            await self.bot.mongo_database.delete_by(
+                "data",
+                "webhooks",
+                {"channel_id": channel.id},
+            )
+            await self.bot.mongo_database.insert(
+                "data",
+                "webhooks",
+                {"channel_id": channel.id, "url": webhook.url},
+            )
+            return webhook
+
+    async def forget(self, channel_id: int) -> None:
+        """
+        Removes the stored webhook for a channel, both in memory and in the database.
+
+        Args:
+            channel_id: The ID of the channel whose webhook should be forgotten.
+        """
+        self.webhooks.pop(channel_id, None)
+        await self.bot.mongo_database.delete_by(
+            "data",
+            "webhooks",
+            {"channel_id": channel_id},
+        )
+
+    async def send(self, channel: discord.TextChannel, content: str, **kwargs) -> None:
+        """
+        Sends a message through the censor webhook of a channel. If the stored
+        webhook was deleted, a new webhook is created and the message is resent.
+
+        Args:
+            channel: The channel to send the message in.
+            content: The content of the message.
+            **kwargs: Any other arguments to pass to :meth:`discord.Webhook.send`.
+        """
+        webhook = await self.get(channel)
+        try:
+            await webhook.send(content, **kwargs)
+        except discord.NotFound:
+            logger.info(f"Censor webhook for #{channel} was deleted, recreating it.")
+            await self.forget(channel.id)
+            webhook = await self.get(channel)
+            await webhook.send(content, **kwargs)
+
 
 class Censor(commands.Cog):
     """
     Responsible for censoring innapropriate words' and emojis in user content.
     """
 
+    matcher: CensorMatcher
+    cache: CensorCache
+    webhook_pool: CensorWebhookPool
+    reported_usernames: set[tuple[int, str]]
+    recent_contents: collections.deque[str]
+    image_hashes: set[int]
+    image_index: BKTree
+    allowed_invite_codes: set[str]
+    censor_version: int
+    reports_version: int
+
+    # The number of members whose names are checked at once during an audit, kept
+    # small so that audits do not hold up censoring messages in the regex pool
+    audit_chunk_size = 200
+
+    # Limits for proposed censor words
+    backtest_corpus_size = 5000  # The number of recent messages kept for backtests
+    backtest_max_p99_ns = 200_000  # The slowest a word may be on 99% of messages
+    backtest_max_match_rate = 0.02  # The largest share of messages a word may match
+
+    # Limits for scanning image attachments
+    image_max_distance = 6  # The most bits an image hash may differ by to be a match
+    image_max_size = 8 * 1024 * 1024  # The largest attachment that is scanned
+    image_download_limit = 4  # The number of attachments downloaded at once
+
     def __init__(self, bot: PiBot):
         self.bot = bot
+        self.matcher = CensorMatcher()
+        self.cache = CensorCache()
+        self.webhook_pool = CensorWebhookPool(bot)
+        self.reported_usernames = set()
+        self.recent_contents = collections.deque(maxlen=self.backtest_corpus_size)
+        self.image_hashes = set()
+        self.image_index = BKTree()
+        self.allowed_invite_codes = set(DISCORD_INVITE_ENDINGS)
+        self.censor_version = -1
+        self.reports_version = -1
+        self._image_downloads = asyncio.Semaphore(self.image_download_limit)
+        # Pillow releases the GIL while decoding, so hashing can run on threads
+        self._hash_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2,
+            thread_name_prefix="image-hash",
+        )
+
+    async def cog_unload(self) -> None:
+        self._hash_executor.shutdown(wait=False, cancel_futures=True)
 
-    async def on_message(self, message: discord.Message) -> None:
+    def refresh_matcher(self) -> None:
+        """
+        Rebuilds the censor matcher from the censor list if the list has changed
+        since the matcher was last built.
+        """
+        censor = src.discord.globals.CENSOR
+        if self.censor_version == censor.version:
+            return
+        self.matcher.rebuild(sorted(censor.words), sorted(censor.emojis))
+        self.censor_version = censor.version
+
+    async def on_message(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+    ) -> bool:
         """
         Will censor the message. Will replace any flags in content with "<censored>".
 
         :param message: The message being checked. message.context will be modified
             if censor gets triggered if and only if the author is not a staff member.
         :type message: discord.Message
+        :param features: The features of the message's content.
+        :type features: MessageFeatures
+        :return: Whether the message was removed.
+        :rtype: bool
         """
         # Type checking - Assume messages come from a text channel where the author
         # is a member of the server
@@ -51,34 +397,40 @@ class Censor(commands.Cog):
             message.author,
             discord.Member,
         ):
-            return
+            return False
 
         # Do not act on messages in staff channels
         if (
             message.channel.category is not None
             and message.channel.category.name == CATEGORY_STAFF
         ):
-            return
+            return False
+
+        removed = False
 
-        # Get the content and attempt to find any words on the censor list
-        content = message.content
-        if await self.censor_needed(content):
+        # Attempt to find any words on the censor list in the normalized content
+        if features.text:
+            self.recent_contents.append(features.text)
+        if await self.censor_needed(features.text):
             logger.debug(
                 f"Censoring message by {message.author} because it contained "
                 "a word or emoji on the censor list.",
             )
 
             await message.delete()
-            await self.__censor(message)
+            removed = True
+            await self.__censor(message, features)
 
-        # Check for invalid Discord invite endings
-        if self.discord_invite_censor_needed(content):
+        # Check for invalid Discord invite endings and blocked domains
+        link_reason = self.link_censor_reason(features.links)
+        if link_reason == "invite":
             logger.debug(
                 f"Censoring message by {message.author} because of the it mentioned "
                 "a Discord invite link.",
             )
 
             await message.delete()
+            removed = True
             support_channel = discord.utils.get(
                 message.author.guild.text_channels,
                 name=CHANNEL_SUPPORT,
@@ -89,46 +441,378 @@ class Censor(commands.Cog):
                 "with rule 12. If you have "
                 f"questions, please ask in {support_channel.mention}.* ",
             )
+        elif link_reason == "domain":
+            logger.debug(
+                f"Censoring message by {message.author} because it linked to "
+                "a blocked domain.",
+            )
+
+            await message.delete()
+            removed = True
+            await message.channel.send(
+                "*Links to this website can not be sent in accordance with rule 2.*",
+            )
+
+        # Check for known inappropriate images
+        if message.attachments and await self.image_censor_needed(
+            message.attachments,
+        ):
+            logger.debug(
+                f"Censoring message by {message.author} because it contained "
+                "a flagged image.",
+            )
+
+            with contextlib.suppress(discord.NotFound):
+                await message.delete()
+            removed = True
 
-    def word_present(self, content: str) -> bool:
-        with contextlib.suppress(asyncio.CancelledError):
-            for word in src.discord.globals.CENSOR["words"]:
-                if re.findall(rf"\b({word})\b", content, re.I):
-                    return True
-            for emoji in src.discord.globals.CENSOR["emojis"]:
-                if len(re.findall(emoji, content)):
-                    return True
-        return False
+        return removed
 
     async def censor_needed(self, content: str) -> bool:
         """
         Determines whether the message has content that needs to be censored.
+        Content should be normalized with :func:`src.features.normalize` first.
+
+        The check runs in the bot's regex pool, so a censor entry which takes too
+        long on the content is stopped rather than left running. Content which
+        makes an entry go over its time budget is treated as needing the censor,
+        so that content crafted to make an entry time out cannot skip it. Content
+        which could not be checked because the pool was busy or failing is let
+        through, and logged.
         """
+        self.refresh_matcher()
+        pattern = self.matcher.pattern
+        if pattern is None:
+            return False
+
+        # Repeated content skips matching entirely
+        version = self.matcher.version
+        cached = self.cache.get("verdict", content, version)
+        if cached is not None:
+            return bool(cached)
+
         try:
-            if await asyncio.wait_for(
-                asyncio.to_thread(self.word_present, content),
-                timeout=1.5,
-            ):
-                return True
+            verdict = await self.bot.regex_pool.run(
+                "search",
+                pattern.pattern,
+                pattern.flags,
+                content,
+            )
+            self.cache.put("verdict", content, version, verdict)
+            return verdict
         except asyncio.TimeoutError:
-            logger.warn(f"TimeoutError while checking for censored words in {content}")
-        return False
+            logger.warning(
+                f"TimeoutError while checking for censored words in {content}",
+            )
+            return True
+        except RegexPoolError as e:
+            logger.error(
+                f"Could not check for censored words, letting content through: {e}",
+            )
+            return False
+
+    async def censored_content(self, features: MessageFeatures) -> str:
+        """
+        Returns the original content with everything on the censor list replaced
+        with "<censored>".
 
-    def discord_invite_censor_needed(self, content: str) -> bool:
+        Entries are found in the normalized content, and replaced in the original
+        content, so the rest of the message keeps its formatting and alphabet.
+        This is only called once content is known to need the censor, so if the
+        entries cannot be found, none of the content is reposted.
         """
-        Determines whether the Discord invite link censor is needed. In other
-        words, whether this content contains a Discord invite link.
+        self.refresh_matcher()
+        pattern = self.matcher.pattern
+        if pattern is None:
+            return features.content
+
+        version = self.matcher.version
+        cached = self.cache.get("censored", features.content, version)
+        if isinstance(cached, str):
+            return cached
+
+        find_spans = functools.partial(
+            self.bot.regex_pool.run,
+            "spans",
+            pattern.pattern,
+            pattern.flags,
+            features.text,
+        )
+        try:
+            try:
+                matches = await find_spans()
+            except RegexPoolBusy:
+                # Waiting a little longer is fine, as the message is already deleted
+                matches = await find_spans()
+        except (asyncio.TimeoutError, RegexPoolError):
+            # Never repost content that could not be fully censored
+            return "<censored>"
+
+        # Content which cannot be mapped back is censored in its normalized form
+        content, spans = features.content, features.spans
+        if spans is None:
+            content, spans = features.text, [(i, i + 1) for i in range(len(content))]
+
+        pieces = []
+        position = 0
+        for start, end in matches:
+            original_start, original_end = spans[start][0], spans[end - 1][1]
+            pieces.append(content[position : max(position, original_start)])
+            pieces.append("<censored>")
+            position = max(position, original_end)
+        pieces.append(content[position:])
+        censored = "".join(pieces)
+
+        self.cache.put("censored", features.content, version, censored)
+        return censored
+
+    async def backtest(self, word: str) -> CensorBacktest:
         """
-        if not any(
-            ending for ending in DISCORD_INVITE_ENDINGS if ending in content
-        ) and (
-            len(re.findall("discord.gg", content, re.I)) > 0
-            or len(re.findall("discord.com/invite", content, re.I)) > 0
+        Runs a proposed censor word against the recently seen messages, measuring
+        how many messages it would censor and how long it takes to match.
+
+        Args:
+            word: The proposed censor word.
+
+        Raises:
+            asyncio.TimeoutError: The word took too long to run against the messages.
+            RegexPoolError: The word is not a valid regular expression.
+        """
+        corpus = list(self.recent_contents)
+        result = await self.bot.regex_pool.run(
+            "backtest",
+            rf"\b({word})\b",
+            re.I,
+            corpus,
+            5,
+            timeout=5,
+        )
+        return {
+            "corpus_size": len(corpus),
+            "hits": result["hits"],
+            "samples": [corpus[i] for i in result["samples"]],
+            "p50_ns": result["p50_ns"],
+            "p99_ns": result["p99_ns"],
+        }
+
+    def backtest_rejection(self, backtest: CensorBacktest) -> str | None:
+        """
+        Returns the reason a proposed censor word should be rejected based on its
+        backtest, or None if the word is acceptable.
+        """
+        if backtest["p99_ns"] > self.backtest_max_p99_ns:
+            return (
+                f"it takes {backtest['p99_ns'] / 1000:.0f}μs to match on 1% of "
+                f"messages (the limit is {self.backtest_max_p99_ns / 1000:.0f}μs)"
+            )
+        if (
+            backtest["corpus_size"]
+            and backtest["hits"] / backtest["corpus_size"]
+            > self.backtest_max_match_rate
         ):
-            return True
-        return False
+            return (
+                f"it matches {backtest['hits']} of the last "
+                f"{backtest['corpus_size']} messages"
+            )
+        return None
 
-    async def __censor(self, message: discord.Message):
+    def load_image_hashes(self, docs: list[dict]) -> None:
+        """
+        Replaces the index of flagged images with the hashes in the given documents
+        from the image hashes collection.
+        """
+        self.image_hashes = {int(doc["hash"], 16) for doc in docs}
+        self.image_index = BKTree(list(self.image_hashes))
+
+    def add_image_hash(self, value: int) -> None:
+        """
+        Adds a flagged image hash to the index.
+        """
+        self.image_hashes.add(value)
+        self.image_index.add(value)
+
+    def remove_image_hashes(self, values: list[int]) -> None:
+        """
+        Removes flagged image hashes from the index. The index is rebuilt, as
+        hashes cannot be removed from it in place.
+        """
+        self.image_hashes.difference_update(values)
+        self.image_index = BKTree(list(self.image_hashes))
+
+    async def hash_attachment(self, attachment: discord.Attachment) -> int | None:
+        """
+        Downloads an image attachment and computes its perceptual hash.
+
+        Returns:
+            The hash of the image, or None if the attachment is not an image which
+            can be hashed.
+        """
+        if (
+            not attachment.content_type
+            or not attachment.content_type.startswith("image/")
+            or attachment.size > self.image_max_size
+        ):
+            return None
+
+        assert self.bot.session is not None
+        try:
+            async with self._image_downloads, self.bot.session.get(
+                attachment.url,
+            ) as response:
+                response.raise_for_status()
+                data = await response.read()
+        except aiohttp.ClientError as e:
+            logger.warning(f"Could not download attachment {attachment.url}: {e}")
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._hash_executor, dhash, data)
+        except Exception as e:
+            logger.warning(f"Could not hash attachment {attachment.url}: {e}")
+            return None
+
+    async def image_censor_needed(self, attachments: list[discord.Attachment]) -> bool:
+        """
+        Determines whether any of the attachments is a flagged image, or is visually
+        similar to one.
+        """
+        if not len(self.image_index):
+            return False
+
+        hashes = await asyncio.gather(
+            *(self.hash_attachment(attachment) for attachment in attachments),
+        )
+        return any(
+            self.image_index.search(value, self.image_max_distance)
+            for value in hashes
+            if value is not None
+        )
+
+    async def report_username(
+        self,
+        member: discord.Member | discord.User,
+        name: str,
+    ) -> bool:
+        """
+        Reports an inappropriate username to staff, unless the same name of the
+        same member has already been reported. Reports are stored in the reports
+        collection, so names are not reported again after a restart.
+
+        Args:
+            member: The member with the inappropriate username.
+            name: The offending name.
+
+        Returns:
+            Whether a new report was filed.
+        """
+        self.refresh_reported_usernames()
+        if (member.id, name) in self.reported_usernames:
+            return False
+        self.reported_usernames.add((member.id, name))
+
+        document = {"type": "username", "user": member.id, "name": name}
+        await self.bot.mongo_database.insert("data", "reports", document)
+        # The change stream may have added the report already
+        if document["_id"] not in src.discord.globals.REPORTS:
+            src.discord.globals.REPORTS.add(Report.from_document(document))
+
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        await reporter_cog.create_inappropriate_username_report(member, name)
+        return True
+
+    def refresh_reported_usernames(self) -> None:
+        """
+        Rebuilds the set of reported names from REPORTS if REPORTS has changed
+        since the set was last built.
+        """
+        reports = src.discord.globals.REPORTS
+        if self.reports_version == reports.version:
+            return
+        self.reported_usernames = {
+            (report.user, report.name)
+            for report in reports
+            if report.type == "username"
+        }
+        self.reports_version = reports.version
+
+    async def audit_usernames(self, guild: discord.Guild) -> int:
+        """
+        Checks the username, nickname and global name of every member in the guild
+        against the censor, and reports any inappropriate names to staff.
+
+        Members are checked in chunks in the regex pool, and the event loop is
+        yielded to between chunks.
+
+        Args:
+            guild: The guild whose members should be audited.
+
+        Returns:
+            The number of new reports filed.
+        """
+        self.refresh_matcher()
+        pattern = self.matcher.pattern
+        if pattern is None:
+            return 0
+
+        members = guild.members
+        reports = 0
+        for start in range(0, len(members), self.audit_chunk_size):
+            owners: list[tuple[discord.Member, str]] = []
+            names: list[str] = []
+            for member in members[start : start + self.audit_chunk_size]:
+                for name in {member.name, member.nick, member.global_name}:
+                    if name:
+                        owners.append((member, name))
+                        names.append(normalize(name))
+
+            try:
+                matches = await self.bot.regex_pool.run(
+                    "search_many",
+                    pattern.pattern,
+                    pattern.flags,
+                    names,
+                )
+            except (asyncio.TimeoutError, RegexPoolError) as e:
+                logger.warning(
+                    f"Skipping {len(names)} names in username audit: {e!r}",
+                )
+                matches = []
+
+            for index in matches:
+                if await self.report_username(*owners[index]):
+                    reports += 1
+
+            # Give up event loop to other coroutines between chunks
+            await asyncio.sleep(0)
+
+        logger.info(
+            f"Audited the names of {len(members)} members, filed {reports} reports.",
+        )
+        return reports
+
+    def link_censor_reason(
+        self,
+        links: list[Link],
+    ) -> Literal["invite", "domain"] | None:
+        """
+        Determines whether any of the links extracted from some content needs to
+        be censored.
+
+        Returns:
+            "invite" if the content contains an invite to another Discord server,
+            "domain" if the content links to a blocked domain, or None if the
+            content can stay.
+        """
+        for link in links:
+            code = invite_code(link)
+            if code is not None and code not in self.allowed_invite_codes:
+                return "invite"
+            if domain_blocked(link.host, src.discord.globals.CENSOR.domains):
+                return "domain"
+        return None
+
+    async def __censor(self, message: discord.Message, features: MessageFeatures):
         """Constructs Pi-Bot's censor."""
         # Type checking
         assert isinstance(message.channel, discord.TextChannel)
@@ -136,20 +820,10 @@ class Censor(commands.Cog):
 
         channel = message.channel
         avatar = message.author.display_avatar.url
-        webhook = await channel.create_webhook(name="Censor (Automated)")
-        content = message.content
         author = message.author.nick or message.author.name
 
         # Actually replace content found on the censored words/emojis list
-        for word in src.discord.globals.CENSOR["words"]:
-            content = re.sub(
-                rf"\b({word})\b",
-                "<censored>",
-                content,
-                flags=re.IGNORECASE,
-            )
-        for emoji in src.discord.globals.CENSOR["emojis"]:
-            content = re.sub(emoji, "<censored>", content, flags=re.I)
+        content = await self.censored_content(features)
 
         reply = (
             (message.reference.resolved or message.reference.cached_message)
@@ -175,14 +849,14 @@ class Censor(commands.Cog):
 
         # Make sure pinging through @everyone, @here, or any role can not happen
         mention_perms = discord.AllowedMentions(everyone=False, users=True, roles=False)
-        await webhook.send(
+        await self.webhook_pool.send(
+            channel,
             content,
             username=f"{author} (auto-censor)",
             avatar_url=avatar,
             allowed_mentions=mention_perms,
             silent=isinstance(reply, discord.Message),
         )
-        await webhook.delete()
 
         # Replace content with censored content for other cogs
         message.content = content
@@ -218,7 +892,8 @@ class Censor(commands.Cog):
             return
 
         # Delete messages that contain censored words
-        censor_found = await self.censor_needed(after.content)
+        features = MessageFeatures.build(after.content)
+        censor_found = await self.censor_needed(features.text)
         if censor_found:
             await after.delete()
             await after.author.send(
@@ -228,9 +903,9 @@ class Censor(commands.Cog):
                 "messages, and they will not be deleted.",
             )
 
-        # Delete messages that have Discord invite links in them
-        discord_invite_found = self.discord_invite_censor_needed(after.content)
-        if discord_invite_found:
+        # Delete messages that have Discord invite links or blocked links in them
+        link_reason = self.link_censor_reason(features.links)
+        if link_reason == "invite":
             await after.delete()
             await after.author.send(
                 "You recently edited a message, but it **contained a link to "
@@ -238,9 +913,33 @@ class Censor(commands.Cog):
                 "delete it. In the future, please do not edit Discord invite "
                 "links into your messages and they will not be deleted.",
             )
+        elif link_reason == "domain":
+            await after.delete()
+            await after.author.send(
+                "You recently edited a message, but it **contained a link to "
+                "a blocked website**! Therefore, I unfortunately had to delete "
+                "it. In the future, please do not edit links to this website "
+                "into your messages and they will not be deleted.",
+            )
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        """
+        Removes the stored censor webhook of a channel when the channel is deleted.
+
+        Args:
+            channel (discord.abc.GuildChannel): The channel that was deleted.
+        """
+        if channel.id in self.webhook_pool.webhooks:
+            await self.webhook_pool.forget(channel.id)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
+        # Members joining during a raid are quarantined in batches instead
+        raid_cog: commands.Cog | RaidManager = self.bot.get_cog("RaidManager")
+        if await raid_cog.handle_join(member):
+            return
+
         # Give new user confirmed role
         unconfirmed_role = discord.utils.get(member.guild.roles, name=ROLE_UC)
         assert isinstance(unconfirmed_role, discord.Role)
@@ -248,11 +947,9 @@ class Censor(commands.Cog):
 
         # Check to see if user's name is innapropriate
         name = member.name
-        if await self.censor_needed(name):
+        if await self.censor_needed(normalize(name)):
             # If name contains a censored link
-            reporter_cog = self.bot.get_cog("Reporter")
-            assert isinstance(reporter_cog, Reporter)
-            await reporter_cog.create_inappropriate_username_report(member, member.name)
+            await self.report_username(member, member.name)
 
     @commands.Cog.listener()
     async def on_member_update(self, _, after):
@@ -269,12 +966,10 @@ class Censor(commands.Cog):
             return  # No need to check if user does not have a new nickname set
 
         # Get the Censor cog
-        censor_found = await self.censor_needed(after.nick)
+        censor_found = await self.censor_needed(normalize(after.nick))
         if censor_found:
             # If name contains a censored link
-            reporter_cog = self.bot.get_cog("Reporter")
-            assert isinstance(reporter_cog, Reporter)
-            await reporter_cog.create_inappropriate_username_report(after, after.nick)
+            await self.report_username(after, after.nick)
 
     @commands.Cog.listener()
     async def on_user_update(self, _, after):
@@ -286,12 +981,10 @@ class Censor(commands.Cog):
             after (discord.Member): The member after updating their profile.
         """
         # Get the Censor cog and see if user's new username is offending censor
-        censor_found = await self.censor_needed(after.name)
+        censor_found = await self.censor_needed(normalize(after.name))
         if censor_found:
             # If name contains a censored link
-            reporter_cog = self.bot.get_cog("Reporter")
-            assert isinstance(reporter_cog, Reporter)
-            await reporter_cog.create_inappropriate_username_report(after, after.name)
+            await self.report_username(after, after.name)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -301,7 +994,7 @@ class Censor(commands.Cog):
         Args:
             payload (discord.RawReactionActionEvent): The payload to use for the message.
         """
-        if str(payload.emoji) in src.discord.globals.CENSOR["emojis"]:
+        if str(payload.emoji) in src.discord.globals.CENSOR.emojis:
             channel = self.bot.get_channel(payload.channel_id)
             assert isinstance(channel, discord.TextChannel)
 
@@ -3,6 +3,8 @@ Holds global variables shared between cogs and variables that are initialized wh
 the bot is first setup.
 """
 
+from src.store import CensorList, Collection, Event, PingSubscriber, Report, Tag
+
 ##############
 # CONSTANTS
 ##############
@@ -120,10 +122,10 @@ DISCORD_AUTOCOMPLETE_MAX_ENTRIES = 25
 # VARIABLES
 ##############
 fish_now = 0
-CENSOR = {}
-EVENT_INFO = []
-PING_INFO = []
+CENSOR = CensorList()
+EVENT_INFO: Collection[Event] = Collection(Event, "name")
+PING_INFO: Collection[PingSubscriber] = Collection(PingSubscriber, "user_id")
 INVITATIONAL_INFO = []
-REPORTS = []
-TAGS = []
+REPORTS: Collection[Report] = Collection(Report, "_id")
+TAGS: Collection[Tag] = Collection(Tag, "name")
 CURRENT_WIKI_PAGE = None
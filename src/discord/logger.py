@@ -26,6 +26,8 @@ from src.discord.globals import (
 if TYPE_CHECKING:
     from bot import PiBot
 
+    from .raid import RaidManager
+
 
 logger = logging.getLogger(__name__)
 
@@ -113,6 +115,12 @@ class Logger(commands.Cog):
         Args:
             member (discord.Member): The member who left the server.
         """
+        # Members removed by a raid cleanup are summarized in one report instead
+        raid_cog: commands.Cog | RaidManager = self.bot.get_cog("RaidManager")
+        if member.id in raid_cog.removing:
+            raid_cog.removing.discard(member.id)
+            return
+
         # Post a leaving info message
         leave_channel = discord.utils.get(
             member.guild.text_channels,
@@ -42,6 +42,7 @@ if TYPE_CHECKING:
     from bot import PiBot
 
     from .reporter import Reporter
+    from .tasks import CronTasks
 
 
 class MemberCommands(commands.Cog):
@@ -598,16 +599,8 @@ class MemberCommands(commands.Cog):
                     name=CHANNEL_UNSELFMUTE,
                 )
                 await member.add_roles(role)
-                await self.bot.mongo_database.insert(
-                    "data",
-                    "cron",
-                    {
-                        "type": "UNSELFMUTE",
-                        "user": member.id,
-                        "time": times[mute_length],
-                        "tag": str(member),
-                    },
-                )
+                cron_cog: commands.Cog | CronTasks = self.bot.get_cog("CronTasks")
+                await cron_cog.schedule_unselfmute(member, times[mute_length])
                 return await interaction.edit_original_response(
                     content=f"You have been muted. You may use the button in the {unselfmute_channel.mention} channel to unmute.",
                     embed=None,
@@ -1184,14 +1177,14 @@ class MemberCommands(commands.Cog):
             event_ten,
         ]
         param_list = [p for p in param_list if p is not None]
-        event_names = [e["name"] for e in src.discord.globals.EVENT_INFO]
-
         selected_roles = [
             discord.utils.get(member.guild.roles, name=e)
             for e in param_list
-            if e in event_names
+            if e in src.discord.globals.EVENT_INFO
+        ]
+        could_not_handle = [
+            p for p in param_list if p not in src.discord.globals.EVENT_INFO
         ]
-        could_not_handle = [p for p in param_list if p not in event_names]
 
         for role in selected_roles:
             if role in member.roles:
@@ -1248,9 +1241,9 @@ class MemberCommands(commands.Cog):
             List[app_commands.Choice[str]]: A list of string choices to choose from.
         """
         return [
-            app_commands.Choice(name=e["name"], value=e["name"])
+            app_commands.Choice(name=e.name, value=e.name)
             for e in src.discord.globals.EVENT_INFO
-            if current.lower() in e["name"].lower()
+            if current.lower() in e.name.lower()
         ][:DISCORD_AUTOCOMPLETE_MAX_ENTRIES]
 
     @app_commands.command(description="Gets a tag.")
@@ -1280,20 +1273,20 @@ class MemberCommands(commands.Cog):
         lh_role = discord.utils.get(member.guild.roles, name=ROLE_LH)
         member_role = discord.utils.get(member.guild.roles, name=ROLE_MR)
 
-        for t in src.discord.globals.TAGS:
-            if t["name"] == tag_name:
-                if (
-                    staff
-                    or (t["permissions"]["launch_helpers"] and lh_role in member.roles)
-                    or (t["permissions"]["members"] and member_role in member.roles)
-                ):
-                    return await interaction.response.send_message(content=t["output"])
-                else:
-                    return await interaction.response.send_message(
-                        content="Unfortunately, you do not have the permissions for this tag.",
-                    )
-
-        return await interaction.response.send_message("Tag not found.")
+        t = src.discord.globals.TAGS.get(tag_name)
+        if t is None:
+            return await interaction.response.send_message("Tag not found.")
+
+        if (
+            staff
+            or (t.permissions["launch_helpers"] and lh_role in member.roles)
+            or (t.permissions["members"] and member_role in member.roles)
+        ):
+            return await interaction.response.send_message(content=t.output)
+        else:
+            return await interaction.response.send_message(
+                content="Unfortunately, you do not have the permissions for this tag.",
+            )
 
     @tag.autocomplete(name="tag_name")
     async def tag_autocomplete(
@@ -1325,10 +1318,10 @@ class MemberCommands(commands.Cog):
 
         # Send the tags
         tags: list[str] = [
-            t["name"]
+            t.name
             for t in src.discord.globals.TAGS
-            if (t["permissions"]["staff"] and is_staff)
-            or (t["permissions"]["members"] and is_member)
+            if (t.permissions["staff"] and is_staff)
+            or (t.permissions["members"] and is_member)
         ]
         return [
             app_commands.Choice(name=t, value=t)
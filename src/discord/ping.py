@@ -7,9 +7,10 @@ from __future__ import annotations
 import asyncio
 import collections
 import contextlib
-import datetime
 import logging
 import re
+import time
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 import discord
@@ -20,6 +21,10 @@ import src.discord.globals
 from commandchecks import is_in_bot_spam
 from env import env
 from src.discord.globals import CHANNEL_BOTSPAM
+from src.features import MessageFeatures
+from src.pingindex import PingIndex, nested_quantifiers, ping_pattern, ping_tokens
+from src.regexpool import RegexPoolBusy, RegexPoolError
+from src.store import PingSubscriber
 
 if TYPE_CHECKING:
     from bot import PiBot
@@ -28,24 +33,448 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+@dataclass()
+class PingAlert:
+    """
+    Pings found for one user in one channel, waiting to be sent as one alert.
+    """
+
+    message: discord.Message  # The latest message containing the user's pings
+    ping_count: int
+    message_count: int = 1
+
+    def merge(self, message: discord.Message, ping_count: int) -> None:
+        """
+        Merges the pings found in another message into the alert.
+        """
+        self.message = message
+        self.ping_count += ping_count
+        self.message_count += 1
+
+
+class PingContext:
+    """
+    The recent messages of each channel, kept as short snippets for the context
+    shown in ping alerts.
+
+    Snippets older than the maximum age are removed when their channel is read.
+    Only the most recently active channels are kept, so memory stays bounded no
+    matter how many channels exist.
+    """
+
+    channels: collections.OrderedDict[int, collections.deque[tuple[float, str, str]]]
+
+    def __init__(
+        self,
+        size: int = 5,
+        max_age: float = 3 * 60 * 60,
+        max_channels: int = 500,
+        snippet_length: int = 200,
+    ):
+        self.size = size
+        self.max_age = max_age
+        self.max_channels = max_channels
+        self.snippet_length = snippet_length
+        self.channels = collections.OrderedDict()
+
+    def add(self, message: discord.Message, now: float) -> None:
+        """
+        Stores a snippet of a message in its channel's context.
+        """
+        context = self.channels.get(message.channel.id)
+        if context is None:
+            context = self.channels[message.channel.id] = collections.deque(
+                maxlen=self.size,
+            )
+            if len(self.channels) > self.max_channels:
+                self.channels.popitem(last=False)
+        else:
+            self.channels.move_to_end(message.channel.id)
+        context.append(
+            (now, message.author.mention, message.content[: self.snippet_length]),
+        )
+
+    def get(self, channel_id: int, now: float) -> list[tuple[str, str]]:
+        """
+        Returns the author mention and snippet of each recent message in a channel,
+        oldest first.
+        """
+        context = self.channels.get(channel_id)
+        if context is None:
+            return []
+        while context and now - context[0][0] > self.max_age:
+            context.popleft()
+        return [(mention, snippet) for _, mention, snippet in context]
+
+
 class PingManager(commands.GroupCog, name="ping"):
     """
     Specific cog for holding ping-related functionality.
     """
 
-    recent_messages: dict[int, collections.deque[discord.Message]]
+    context: PingContext
+    index: PingIndex
+    index_version: int
+    visible_subscribers: dict[int, set[int]]
+    pending_alerts: dict[tuple[int, int], PingAlert]
+    # When the merge window of each user and channel ends, earliest first
+    alert_windows: collections.OrderedDict[tuple[int, int], float]
+    alert_queue: asyncio.Queue[tuple[int, int]]
+    # The alerts collected for each user in digest mode. These are only kept in
+    # memory, so alerts collected since the last digest are lost on restart.
+    digests: dict[int, dict[int, PingAlert]]
+
+    ping_max_length = 100  # The number of characters a ping can have
+
+    # Alert delivery
+    alert_window = 30  # The number of seconds alerts for a user in a channel are merged
+    alert_workers = 3  # The number of alerts sent at once
+    alert_interval = 0.25  # The smallest number of seconds between two alerts
 
     def __init__(self, bot: PiBot):
         self.bot = bot
-        self.recent_messages = {}
+        self.context = PingContext()
+        self.index = PingIndex()
+        self.index_version = -1
+        self.visible_subscribers = {}
+        self.pending_alerts = {}
+        self.alert_windows = collections.OrderedDict()
+        self.alert_queue = asyncio.Queue()
+        self.digests = {}
+        self._next_alert = 0.0
+        self._alert_pacing = asyncio.Lock()
+        self._workers: list[asyncio.Task] = []
+
+    async def cog_load(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._alert_worker()) for _ in range(self.alert_workers)
+        ]
+
+    async def cog_unload(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+
+    def queue_alert(
+        self,
+        user: PingSubscriber,
+        message: discord.Message,
+        ping_count: int,
+    ) -> None:
+        """
+        Queues a ping alert for a user. Alerts for the same user and channel are
+        merged: in digest mode, until the next digest is sent, and otherwise, for
+        a short window after each alert is sent. An alert outside of a window is
+        sent right away.
+
+        Args:
+            user: The user's record from PING_INFO.
+            message: The message containing the user's pings.
+            ping_count: The number of the user's pings in the message.
+        """
+        if user.digest:
+            alerts = self.digests.setdefault(user.user_id, {})
+            if message.channel.id in alerts:
+                alerts[message.channel.id].merge(message, ping_count)
+            else:
+                alerts[message.channel.id] = PingAlert(message, ping_count)
+            return
+
+        key = (user.user_id, message.channel.id)
+        if key in self.pending_alerts:
+            self.pending_alerts[key].merge(message, ping_count)
+            return
+
+        now = time.monotonic()
+        while self.alert_windows and next(iter(self.alert_windows.values())) <= now:
+            self.alert_windows.popitem(last=False)
+
+        self.pending_alerts[key] = PingAlert(message, ping_count)
+        window_end = self.alert_windows.pop(key, None)
+        if window_end is None:
+            # Send the first alert now, and merge any that follow for a window
+            self.alert_windows[key] = now + self.alert_window
+            self.alert_queue.put_nowait(key)
+        else:
+            # Send the merged alerts once the window ends, starting a new window
+            self.alert_windows[key] = window_end + self.alert_window
+            asyncio.get_running_loop().call_later(
+                window_end - now,
+                self.alert_queue.put_nowait,
+                key,
+            )
+
+    async def _wait_for_alert_slot(self) -> None:
+        """
+        Waits until another alert can be sent, spacing out alerts to stay under
+        Discord's direct message rate limits.
+        """
+        async with self._alert_pacing:
+            now = time.monotonic()
+            delay = self._next_alert - now
+            self._next_alert = max(now, self._next_alert) + self.alert_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _alert_worker(self) -> None:
+        """
+        Sends queued ping alerts.
+        """
+        while True:
+            key = await self.alert_queue.get()
+            alert = self.pending_alerts.pop(key, None)
+            user = self.bot.get_user(key[0])
+            if alert is None or user is None:
+                continue
+
+            await self._wait_for_alert_slot()
+            try:
+                await self.send_ping_pm(user, alert.message, alert.ping_count)
+            except discord.Forbidden:
+                pass  # The user has direct messages disabled
+            except discord.HTTPException as e:
+                logger.warning(f"Could not send ping alert to {user}: {e}")
+            except Exception:
+                logger.exception(f"Error while sending ping alert to {user}:")
+
+    async def send_digests(self) -> None:
+        """
+        Sends every user in digest mode one message summarizing the alerts
+        collected since their last digest. Collected alerts are not stored, so
+        a restart loses them.
+        """
+        digests, self.digests = self.digests, {}
+        for user_id, alerts in digests.items():
+            user = self.bot.get_user(user_id)
+            if user is None:
+                continue
+
+            lines = [
+                f"**{alert.ping_count}** pings in {alert.message.channel.mention} "
+                f"across {alert.message_count} messages - [Jump to the latest]({alert.message.jump_url})"
+                for alert in alerts.values()
+            ]
+            embed = discord.Embed(
+                title=":bellhop: Ping Digest",
+                color=discord.Color.brand_red(),
+                description="**Your pings were mentioned in the Scioly.org Discord server!**\n\n"
+                + "\n".join(lines[:25]),
+            )
+            embed.set_footer(
+                text="To get an alert for every ping instead, use /ping digest in the Scioly.org Discord server!",
+            )
+
+            await self._wait_for_alert_slot()
+            try:
+                await user.send(embed=embed)
+            except discord.Forbidden:
+                pass  # The user has direct messages disabled
+            except discord.HTTPException as e:
+                logger.warning(f"Could not send ping digest to {user}: {e}")
+            except Exception:
+                logger.exception(f"Error while sending ping digest to {user}:")
+
+    def refresh_pings(self) -> None:
+        """
+        Rebuilds the ping index from PING_INFO if PING_INFO has changed since the
+        index was last built.
+        """
+        if self.index_version == src.discord.globals.PING_INFO.version:
+            return
+        self.index = PingIndex(src.discord.globals.PING_INFO)
+        self.index_version = src.discord.globals.PING_INFO.version
+        self.visible_subscribers.clear()
+
+    def subscribers_who_can_see(
+        self,
+        channel: discord.abc.GuildChannel | discord.Thread,
+    ) -> set[int]:
+        """
+        Returns the IDs of the members with pings who can see a channel. The set is
+        cached until the channel, a role, a subscriber's roles or PING_INFO change.
+        """
+        self.refresh_pings()
+        if channel.id not in self.visible_subscribers:
+            visible = set()
+            for user in src.discord.globals.PING_INFO:
+                member = channel.guild.get_member(user.user_id)
+                if member and channel.permissions_for(member).read_messages:
+                    visible.add(member.id)
+            self.visible_subscribers[channel.id] = visible
+        return self.visible_subscribers[channel.id]
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self,
+        before: discord.abc.GuildChannel,
+        after: discord.abc.GuildChannel,
+    ):
+        """
+        Forgets which subscribers can see a channel when its permissions change.
+        Channels in an updated category may inherit its permissions, so they are
+        forgotten too.
+        """
+        channel_ids = {after.id}
+        if isinstance(after, discord.CategoryChannel):
+            channel_ids.update(channel.id for channel in after.channels)
+        self.forget_channels(after.guild, channel_ids)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.forget_channels(channel.guild, {channel.id})
+
+    def forget_channels(self, guild: discord.Guild, channel_ids: set[int]) -> None:
+        """
+        Forgets which subscribers can see the given channels, and the threads in
+        them, which inherit their parent channel's permissions.
+        """
+        for channel_id in list(self.visible_subscribers):
+            if channel_id in channel_ids:
+                del self.visible_subscribers[channel_id]
+                continue
+            # Threads which are no longer cached cannot be checked, so are forgotten
+            thread = guild.get_channel_or_thread(channel_id)
+            if thread is None or (
+                isinstance(thread, discord.Thread) and thread.parent_id in channel_ids
+            ):
+                del self.visible_subscribers[channel_id]
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        # Any channel may depend on the role's permissions
+        self.visible_subscribers.clear()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.visible_subscribers.clear()
+
+    def update_visibility(self, member: discord.Member) -> None:
+        """
+        Updates which of the cached channels a subscriber can see.
+        """
+        if member.id not in src.discord.globals.PING_INFO:
+            return
+
+        for channel_id, visible in self.visible_subscribers.items():
+            channel = member.guild.get_channel_or_thread(channel_id)
+            if channel and channel.permissions_for(member).read_messages:
+                visible.add(member.id)
+            else:
+                visible.discard(member.id)
 
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            self.update_visibility(after)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.update_visibility(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        for visible in self.visible_subscribers.values():
+            visible.discard(member.id)
+
+    async def matching_pings(
+        self,
+        features: MessageFeatures,
+        user_ids: set[int],
+    ) -> dict[int, list[str]]:
         """
-        Event listening for new messages in an attempt to send out needed pings.
+        Finds the pings of the given users which match a message. Plain word and
+        phrase pings are matched in one pass over the message's words, and pings
+        using regular expressions are evaluated in one call to the regex pool.
+
+        Args:
+            features: The features of the message's content.
+            user_ids: The IDs of the users whose pings should be checked.
+
+        Raises:
+            asyncio.TimeoutError: The regular expression pings took too long to
+                evaluate.
+            RegexPoolError: The regex pool could not evaluate the pings.
+
+        Returns:
+            The matching pings of each user with at least one match.
+        """
+        self.refresh_pings()
+        matches: dict[int, list[str]] = {}
+        for user_id, ping in self.index.match_words(features.tokens):
+            if user_id in user_ids:
+                matches.setdefault(user_id, []).append(ping)
+
+        expressions = [
+            (user_id, ping, pattern)
+            for user_id, ping, pattern in self.index.expressions
+            if user_id in user_ids
+        ]
+        if not expressions:
+            return matches
+
+        results = await self.bot.regex_pool.run(
+            "match_many",
+            [(pattern.pattern, pattern.flags) for _, _, pattern in expressions],
+            features.text,
+        )
+        for (user_id, ping, _), result in zip(expressions, results):
+            if result is None:
+                logger.error(
+                    f"Could not evaluate message content with ping {ping} of user {user_id}",
+                )
+            elif result:
+                matches.setdefault(user_id, []).append(ping)
+        return matches
+
+    async def ping_rejection(self, word: str) -> str | None:
+        """
+        Checks whether a new ping can be added. Pings using regular expression
+        syntax are checked for nested repetition, and are then run against
+        adversarial text in the regex pool with a short time budget.
+
+        Returns:
+            The reason the ping should be rejected, or None if it can be added.
+        """
+        if len(word) > self.ping_max_length:
+            return f"it is longer than {self.ping_max_length} characters"
+        try:
+            pattern = ping_pattern(word)
+        except re.error:
+            return "it uses illegal characters"
+        if ping_tokens(word) is not None:
+            return None
+
+        if nested_quantifiers(word):
+            return "it repeats an expression which is itself repeated, which can be very slow to match"
+
+        # Try the ping on long runs of the characters it uses, which are the inputs
+        # most likely to cause backtracking
+        characters = sorted({c for c in word if c.isalnum()}) or ["a"]
+        trials = [c * 2000 + "!" for c in characters[:5]]
+        trials.append(("".join(characters) * 2000)[:2000] + "!")
+        try:
+            await self.bot.regex_pool.run(
+                "search_many",
+                pattern.pattern,
+                pattern.flags,
+                trials,
+                timeout=0.25,
+            )
+        except asyncio.TimeoutError:
+            return "it takes too long to match on long messages"
+        except RegexPoolBusy:
+            return "the bot is too busy to test it right now (please try again)"
+        except RegexPoolError:
+            return "it uses illegal characters"
+        return None
+
+    async def on_message(self, message: discord.Message, features: MessageFeatures):
+        """
+        Handles new messages in an attempt to send out needed pings. Called by the
+        bot's on_message handler.
 
         Args:
             message (discord.Message): The message that was just sent by a user.
+            features (MessageFeatures): The features of the message's content.
         """
         # Do not ping for messages in a private channel or messages from bots
         if (message.channel.type == discord.ChannelType.private) or message.author.bot:
@@ -60,51 +489,45 @@ class PingManager(commands.GroupCog, name="ping"):
             return
 
         # Store the message to generate recent message history
-        self.recent_messages.setdefault(
-            message.channel.id,
-            collections.deque(maxlen=5),
-        ).append(message)
+        self.context.add(message, time.monotonic())
 
-        # Send a ping alert to the relevant users
-        ids = [m.id for m in message.channel.members]
+        # Find the users who could receive a ping alert
+        visible = self.subscribers_who_can_see(message.channel)
+        mentioned = {m.id for m in message.mentions}
+        eligible_users = []
         for user in src.discord.globals.PING_INFO:
-            # Give up event loop to other coroutines in case ping list is long
-            await asyncio.sleep(0)
-
             # Do not ping if:
             #   User was author of message.
             #   User was mentioned in the message.
             #   User cannot see the channel.
             #   User has DND enabled.
-            user_is_mentioned = user["user_id"] in [m.id for m in message.mentions]
-            user_can_see_channel = user["user_id"] in ids
-            user_in_dnd = "dnd" in user and user["dnd"]
+            user_is_mentioned = user.user_id in mentioned
+            user_can_see_channel = user.user_id in visible
+            user_in_dnd = user.dnd
             if (
-                user["user_id"] == message.author.id
+                user.user_id == message.author.id
                 or user_is_mentioned
                 or (not user_can_see_channel or user_in_dnd)
             ):
                 continue
+            eligible_users.append(user)
 
-            # Count the number of pings in the message
-            ping_count = 0
-            pings = [rf"\b({ping})\b" for ping in user["word_pings"]]
-            for ping in pings:
-                try:
-                    if len(re.findall(ping, message.content, re.I)):
-                        ping_count += 1
-                except Exception as e:
-                    logger.error(
-                        f"Could not evaluate message content with ping {ping} of user {user['user_id']}: {e!s}",
-                    )
+        # Find the pings of eligible users in the message
+        try:
+            matches = await self.matching_pings(
+                features,
+                {user.user_id for user in eligible_users},
+            )
+        except (asyncio.TimeoutError, RegexPoolError) as e:
+            logger.warning(f"Could not evaluate pings for message {message.id}: {e!r}")
+            return
 
-            if ping_count:
-                user_obj = self.bot.get_user(user["user_id"])
-                # Do not throw exception if the user has direct messages disabled
-                with contextlib.suppress(discord.Forbidden):
-                    await self.send_ping_pm(user_obj, message, ping_count)
+        # Queue a ping alert for the relevant users
+        for user in eligible_users:
+            if user.user_id in matches:
+                self.queue_alert(user, message, len(matches[user.user_id]))
 
-    def format_text(
+    async def format_text(
         self,
         text: str,
         length: int,
@@ -122,20 +545,23 @@ class PingManager(commands.GroupCog, name="ping"):
                 with respect to. This is used to get relevant ping info about the
                 specific user.
         """
-        user_ping_obj = next(
-            user_obj
-            for user_obj in src.discord.globals.PING_INFO
-            if user_obj["user_id"] == user.id
-        )
-        assert isinstance(user_ping_obj, dict)
-
-        pings = [rf"\b({ping})\b" for ping in user_ping_obj["word_pings"]]
-
-        for expression in pings:
-            try:
-                text = re.sub(rf"{expression}", r"**\1**", text, flags=re.I)
-            except Exception as e:
-                logger.warn(f"Could not bold ping due to unfavored RegEx. Error: {e}")
+        self.refresh_pings()
+        for pattern in self.index.patterns.get(user.id, []):
+            text = pattern.sub(r"**\1**", text)
+
+        # Pings using regular expression syntax are highlighted in the regex pool,
+        # and are left unhighlighted if they cannot be
+        for user_id, _, pattern in self.index.expressions:
+            if user_id != user.id:
+                continue
+            with contextlib.suppress(asyncio.TimeoutError, RegexPoolError):
+                text = await self.bot.regex_pool.run(
+                    "sub",
+                    pattern.pattern,
+                    pattern.flags,
+                    r"**\1**",
+                    text,
+                )
 
         # Prevent the text from being too long
         if len(text) > length:
@@ -143,19 +569,6 @@ class PingManager(commands.GroupCog, name="ping"):
         else:
             return text
 
-    def expire_recent_messages(self) -> None:
-        """
-        Remove all recent messages older than a specified amount of time.
-
-        Currently, this is called whenever a ping PM is sent.
-        """
-        for _, messages in self.recent_messages.items():
-            for message in messages.copy():
-                if (discord.utils.utcnow() - message.created_at) > datetime.timedelta(
-                    hours=3,
-                ):
-                    messages.remove(message)
-
     async def send_ping_pm(
         self,
         user: discord.User,
@@ -170,9 +583,6 @@ class PingManager(commands.GroupCog, name="ping"):
             message (discord.Message): The message which triggered the ping.
             ping_count (int): How many pings were triggered by the specific message.
         """
-        # Expire recent messages
-        self.expire_recent_messages()
-
         # Create the alert embed
         description = ""
         if ping_count == 1:
@@ -185,8 +595,11 @@ class PingManager(commands.GroupCog, name="ping"):
             + "\n\n"
             + "\n".join(
                 [
-                    f"{message.author.mention}: {self.format_text(message.content, 100, user)}"
-                    for message in self.recent_messages[message.channel.id]
+                    f"{mention}: {await self.format_text(snippet, 100, user)}"
+                    for mention, snippet in self.context.get(
+                        message.channel.id,
+                        time.monotonic(),
+                    )
                 ],
             )
         )
@@ -224,34 +637,73 @@ class PingManager(commands.GroupCog, name="ping"):
             interaction (discord.Interaction): The discord app command which triggered
                 the command.
         """
-        user = [
-            u
-            for u in src.discord.globals.PING_INFO
-            if u["user_id"] == interaction.user.id
-        ]
+        user = src.discord.globals.PING_INFO.get(interaction.user.id)
 
-        if len(user):
-            user = user[0]
-            if "dnd" not in user:
-                user["dnd"] = True
+        if user is not None:
+            user = src.discord.globals.PING_INFO.update(user.user_id, dnd=not user.dnd)
+            # Stored so that the member's next change to their pings, when read
+            # back from the change stream, keeps their DND mode
+            self.bot.mongo_database.queue_update(
+                "data",
+                "pings",
+                user._id,
+                {"$set": {"dnd": user.dnd}},
+            )
+            if user.dnd:
                 return await interaction.response.send_message(
                     "Enabled DND mode for pings.",
                 )
-            elif user["dnd"]:
-                user["dnd"] = False
-                return await interaction.response.send_message(
-                    "Disabled DND mode for pings.",
-                )
             else:
-                user["dnd"] = True
                 return await interaction.response.send_message(
-                    "Enabled DND mode for pings.",
+                    "Disabled DND mode for pings.",
                 )
         else:
             return await interaction.response.send_message(
                 "You can't enter DND mode without any pings!",
             )
 
+    @app_commands.command(
+        description="Toggles receiving ping alerts as a periodic digest.",
+    )
+    @app_commands.guilds(*env.slash_command_guilds)
+    @app_commands.checks.cooldown(2, 60, key=lambda i: (i.guild_id, i.user.id))
+    @app_commands.check(is_in_bot_spam)
+    async def digest(self, interaction: discord.Interaction):
+        """
+        Discord command allowing members to receive their ping alerts as a digest
+        every half hour, rather than as separate messages.
+
+        Permissions:
+            Confirmed members: Unconfirmed members cannot access this command.
+
+        Args:
+            interaction (discord.Interaction): The discord app command which triggered
+                the command.
+        """
+        user = src.discord.globals.PING_INFO.get(interaction.user.id)
+        if user is None:
+            return await interaction.response.send_message(
+                "You can't enter digest mode without any pings!",
+            )
+
+        user = src.discord.globals.PING_INFO.update(
+            user.user_id,
+            digest=not user.digest,
+        )
+        self.bot.mongo_database.queue_update(
+            "data",
+            "pings",
+            user._id,
+            {"$set": {"digest": user.digest}},
+        )
+        if user.digest:
+            return await interaction.response.send_message(
+                "Enabled digest mode for pings. Your alerts will be sent together every half hour.",
+            )
+        return await interaction.response.send_message(
+            "Disabled digest mode for pings.",
+        )
+
     @app_commands.command(
         name="add",
         description="Adds a new ping to notify you about.",
@@ -274,48 +726,44 @@ class PingManager(commands.GroupCog, name="ping"):
             word (str): The new word to ping on.
         """
         member = interaction.user
-        if any(
-            (True for u in src.discord.globals.PING_INFO if u["user_id"] == member.id),
-        ):
-            # User already has an object in the PING_INFO dictionary
-            user = next(
-                (u for u in src.discord.globals.PING_INFO if u["user_id"] == member.id),
-                None,
+        if rejection := await self.ping_rejection(word):
+            return await interaction.response.send_message(
+                f"Ignoring adding the `{word}` ping because {rejection}.",
             )
-            pings = user["word_pings"]
-            try:
-                re.findall(word, "test phrase")
-            except Exception:
-                return await interaction.response.send_message(
-                    f"Ignoring adding the `{word}` ping because it uses illegal characters.",
-                )
+
+        user = src.discord.globals.PING_INFO.get(member.id)
+        if user is not None:
+            # User already has a record in PING_INFO
+            pings = user.word_pings
             if f"({word})" in pings or f"\\b({word})\\b" in pings or word in pings:
                 return await interaction.response.send_message(
                     f"Ignoring adding the `{word}` ping because you already have a ping currently set as that.",
                 )
             else:
                 logger.debug(f"adding word: {re.escape(word)}")
-                relevant_doc = next(
-                    doc
-                    for doc in src.discord.globals.PING_INFO
-                    if doc["user_id"] == member.id
+                src.discord.globals.PING_INFO.update(
+                    member.id,
+                    word_pings=[*pings, word],
                 )
-                relevant_doc["word_pings"].append(word)
-                await self.bot.mongo_database.update(
+                self.bot.mongo_database.queue_update(
                     "data",
                     "pings",
-                    user["_id"],
+                    user._id,
                     {"$push": {"word_pings": word}},
                 )
         else:
-            # User does not already have an object in the PING_INFO dictionary
+            # User does not already have a record in PING_INFO
             new_user_dict = {
                 "user_id": member.id,
                 "word_pings": [word],
                 "dnd": False,
             }
-            src.discord.globals.PING_INFO.append(new_user_dict)
             await self.bot.mongo_database.insert("data", "pings", new_user_dict)
+            # The change stream may have added the record already
+            if member.id not in src.discord.globals.PING_INFO:
+                src.discord.globals.PING_INFO.add(
+                    PingSubscriber.from_document(new_user_dict),
+                )
         small_ping_message = ""
         if len(word) < 4:
             small_ping_message = (
@@ -348,28 +796,24 @@ class PingManager(commands.GroupCog, name="ping"):
             test (str): The phrase to test the list of pings against.
         """
         member = interaction.user
-        user = next(
-            (u for u in src.discord.globals.PING_INFO if u["user_id"] == member.id),
-            None,
-        )
-        assert isinstance(user, dict)
+        user = src.discord.globals.PING_INFO.get(member.id)
+        assert isinstance(user, PingSubscriber)
+
+        try:
+            matches = await self.matching_pings(
+                MessageFeatures.build(test),
+                {member.id},
+            )
+        except (asyncio.TimeoutError, RegexPoolError):
+            return await interaction.response.send_message(
+                "Your pings took too long to test against this phrase.",
+            )
 
-        word_pings = [
-            {"new": rf"\b({ping})\b", "original": ping} for ping in user["word_pings"]
-        ]
-        user_pings = word_pings
         matched = False
         response = ""
-
-        for ping in user_pings:
-            if isinstance(ping, dict):
-                if len(re.findall(ping["new"], test, re.I)) > 0:
-                    response += f"Your ping `{ping['original']}` matches `{test}`.\n"
-                    matched = True
-            else:
-                if len(re.findall(ping, test, re.I)) > 0:
-                    response += f"Your ping `{ping}` matches `{test}`.\n"
-                    matched = True
+        for ping in matches.get(member.id, []):
+            response += f"Your ping `{ping}` matches `{test}`.\n"
+            matched = True
 
         if not matched:
             return await interaction.response.send_message(
@@ -397,22 +841,19 @@ class PingManager(commands.GroupCog, name="ping"):
                 command.
         """
         member = interaction.user
-        user = next(
-            (u for u in src.discord.globals.PING_INFO if u["user_id"] == member.id),
-            None,
-        )
+        user = src.discord.globals.PING_INFO.get(member.id)
 
         # User has no pings
-        if user is None or len(user["word_pings"]) == 0:
+        if user is None or len(user.word_pings) == 0:
             return await interaction.response.send_message(
                 "You have no registered pings.",
             )
 
         else:
             response = ""
-            if len(user["word_pings"]) > 0:
+            if len(user.word_pings) > 0:
                 response += "Your pings are: " + ", ".join(
-                    [f"`{word}`" for word in user["word_pings"]],
+                    [f"`{word}`" for word in user.word_pings],
                 )
             if not response:
                 response = "You have no registered pings."
@@ -442,74 +883,52 @@ class PingManager(commands.GroupCog, name="ping"):
         """
         # Get the user's info
         member = interaction.user
-        user = next(
-            (u for u in src.discord.globals.PING_INFO if u["user_id"] == member.id),
-            None,
-        )
+        user = src.discord.globals.PING_INFO.get(member.id)
 
         # The user has no pings
-        if user is None or len(user["word_pings"]) == 0:
+        if user is None or len(user.word_pings) == 0:
             return await interaction.response.send_message(
                 "You have no registered pings.",
             )
 
         # Remove all of user's pings
         if word == "all":
-            user["word_pings"] = []
-            await self.bot.mongo_database.update(
+            src.discord.globals.PING_INFO.update(member.id, word_pings=[])
+            self.bot.mongo_database.queue_update(
                 "data",
                 "pings",
-                user["_id"],
+                user._id,
                 {"$set": {"word_pings": []}},
             )
             return await interaction.response.send_message(
                 "I removed all of your pings.",
             )
 
-        # Attempt to remove a word ping
-        if word in user["word_pings"]:
-            user["word_pings"].remove(word)
-            await self.bot.mongo_database.update(
-                "data",
-                "pings",
-                user["_id"],
-                {"$pull": {"word_pings": word}},
-            )
-            return await interaction.response.send_message(
-                f"I removed the `{word}` ping you were referencing.",
-            )
-
-        # Attempt to remove a word ping with extra formatting
-        elif f"\\b({word})\\b" in user["word_pings"]:
-            user["word_pings"].remove(f"\\e({word})\\b")
-            await self.bot.mongo_database.update(
-                "data",
-                "pings",
-                user["_id"],
-                {"$pull": {"word_pings": f"\\e({word})\\b"}},
-            )
-            return await interaction.response.send_message(
-                f"I removed the `{word}` ping you were referencing.",
-            )
-
-        # Attempt to remove a word ping with alternate extra formatting
-        elif f"({word})" in user["word_pings"]:
-            user["word_pings"].remove(f"({word})")
-            await self.bot.mongo_database.update(
-                "data",
-                "pings",
-                user["_id"],
-                {"$pull": {"word_pings": f"({word})"}},
-            )
-            return await interaction.response.send_message(
-                f"I removed the `{word}` RegEx ping you were referencing.",
-            )
+        # Attempt to remove a word ping, with or without extra formatting
+        for ping, kind in (
+            (word, ""),
+            (f"\\b({word})\\b", ""),
+            (f"({word})", " RegEx"),
+        ):
+            if ping in user.word_pings:
+                src.discord.globals.PING_INFO.update(
+                    member.id,
+                    word_pings=[p for p in user.word_pings if p != ping],
+                )
+                self.bot.mongo_database.queue_update(
+                    "data",
+                    "pings",
+                    user._id,
+                    {"$pull": {"word_pings": ping}},
+                )
+                return await interaction.response.send_message(
+                    f"I removed the `{word}`{kind} ping you were referencing.",
+                )
 
-        else:
-            return await interaction.response.send_message(
-                f"I can't find the **`{word}`** ping you are referencing, sorry. Try another ping, or see all of your "
-                f"pings with `/ping list`. ",
-            )
+        return await interaction.response.send_message(
+            f"I can't find the **`{word}`** ping you are referencing, sorry. Try another ping, or see all of your "
+            f"pings with `/ping list`. ",
+        )
 
 
 async def setup(bot: PiBot):
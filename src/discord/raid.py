@@ -0,0 +1,366 @@
+"""
+Detects raids (bursts of accounts joining the Scioly.org Discord server) and
+handles the accounts which joined during a raid in batches, rather than one at a
+time.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import datetime
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import discord
+from discord.ext import commands
+
+from env import env
+from src.discord.globals import CHANNEL_WELCOME, ROLE_QUARANTINE, ROLE_UC
+from src.discord.reporter import RaidReport
+
+if TYPE_CHECKING:
+    from bot import PiBot
+
+    from .reporter import Reporter
+
+
+logger = logging.getLogger(__name__)
+
+
+class Raid:
+    """
+    The state of an ongoing raid.
+    """
+
+    started: datetime.datetime
+    flagged: dict[int, discord.Member]  # Members who joined during the raid
+    quarantined: int
+    failed: int
+    last_join: float
+    report: discord.Message | None
+
+    def __init__(self, now: float):
+        self.started = discord.utils.utcnow()
+        self.flagged = {}
+        self.quarantined = 0
+        self.failed = 0
+        self.last_join = now
+        self.report = None
+
+
+class RaidManager(commands.Cog):
+    """
+    Cog for detecting raids and quarantining, banning or kicking the accounts which
+    joined during them.
+    """
+
+    joins: collections.deque[tuple[float, bool, discord.Member]]
+    raid: Raid | None
+    quarantine_queue: asyncio.Queue[discord.Member]
+    removing: set[int]  # Members being banned or kicked by a raid cleanup
+
+    # Limits
+    raid_window = 60  # The number of seconds that joins are counted over
+    raid_join_limit = 15  # The number of joins in the window which starts a raid
+    raid_young_limit = 8  # The number of young accounts joining which starts a raid
+    raid_account_age = datetime.timedelta(days=7)  # The age of a young account
+    raid_cooldown = 600  # The number of seconds without joins before a raid ends
+    raid_workers = 2  # The number of members quarantined at once
+    raid_concurrency = 5  # The number of ban or kick requests made at once
+    bulk_ban_size = 200  # The number of members Discord can ban in one request
+
+    def __init__(self, bot: PiBot):
+        self.bot = bot
+        self.joins = collections.deque()
+        self.raid = None
+        self.quarantine_queue = asyncio.Queue()
+        self.removing = set()
+        self._workers: list[asyncio.Task] = []
+
+    async def cog_load(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._quarantine_worker())
+            for _ in range(self.raid_workers)
+        ]
+
+    async def cog_unload(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+
+    async def _quarantine_worker(self) -> None:
+        """
+        Assigns the quarantine role to queued members. Both the quarantine and
+        unconfirmed roles are assigned in one request per member, and discord.py
+        waits out any rate limits before retrying.
+        """
+        while True:
+            member = await self.quarantine_queue.get()
+            try:
+                roles = [
+                    role
+                    for role in (
+                        discord.utils.get(member.guild.roles, name=ROLE_QUARANTINE),
+                        discord.utils.get(member.guild.roles, name=ROLE_UC),
+                    )
+                    if role is not None and role not in member.roles
+                ]
+                if roles:
+                    await member.add_roles(
+                        *roles,
+                        reason="Joined during a raid",
+                        atomic=False,
+                    )
+                if self.raid:
+                    self.raid.quarantined += 1
+            except discord.NotFound:
+                pass  # The member already left or was removed
+            except discord.HTTPException as e:
+                logger.warning(f"Could not quarantine {member} during raid: {e}")
+                if self.raid:
+                    self.raid.failed += 1
+            finally:
+                self.quarantine_queue.task_done()
+
+    def flag(self, member: discord.Member) -> None:
+        """
+        Adds a member to the flagged cohort of the current raid, and queues them to
+        be quarantined.
+        """
+        assert self.raid is not None
+        if member.id not in self.raid.flagged:
+            self.raid.flagged[member.id] = member
+            self.quarantine_queue.put_nowait(member)
+
+    async def handle_join(self, member: discord.Member) -> bool:
+        """
+        Records a member joining the server, starting a raid if the join rate or
+        the number of young accounts joining goes over its limit. Called by the
+        Censor cog before it handles the join.
+
+        Args:
+            member: The member who just joined.
+
+        Returns:
+            Whether the member joined during a raid, and was queued to be
+            quarantined rather than being handled normally.
+        """
+        now = time.monotonic()
+        self.removing.discard(member.id)
+        young = discord.utils.utcnow() - member.created_at < self.raid_account_age
+        self.joins.append((now, young, member))
+        while self.joins and self.joins[0][0] < now - self.raid_window:
+            self.joins.popleft()
+
+        if self.raid:
+            self.raid.last_join = now
+            self.flag(member)
+            return True
+
+        young_count = sum(1 for _, is_young, _ in self.joins if is_young)
+        if (
+            len(self.joins) < self.raid_join_limit
+            and young_count < self.raid_young_limit
+        ):
+            return False
+
+        # Start a raid, flagging everyone who joined within the window
+        logger.warning(
+            f"Raid detected: {len(self.joins)} joins ({young_count} young accounts) "
+            f"in the last {self.raid_window} seconds.",
+        )
+        self.raid = Raid(now)
+        for _, _, joined_member in self.joins:
+            self.flag(joined_member)
+
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        self.raid.report = await reporter_cog.create_raid_report(self)
+        return True
+
+    def summary(self, ongoing: bool = True) -> str:
+        """
+        Returns a summary of the current raid for the raid report.
+
+        Args:
+            ongoing: Whether the raid is still ongoing.
+        """
+        assert self.raid is not None
+        raid = self.raid
+        summary = (
+            f"A raid started {discord.utils.format_dt(raid.started, 'R')}. "
+            f"**{len(raid.flagged)} members** are flagged, "
+            f"**{raid.quarantined}** have been quarantined, "
+            f"**{self.quarantine_queue.qsize()}** are waiting to be quarantined, "
+            f"and **{raid.failed}** could not be quarantined."
+        )
+        if ongoing:
+            return (
+                f"{summary}\n\nEvery member who joins while the raid is ongoing is "
+                "flagged and quarantined. The raid ends automatically after "
+                f"{self.raid_cooldown // 60} minutes without any joins."
+            )
+        return (
+            f"{summary}\n\nThe raid has ended. Flagged members stay quarantined "
+            "until staff remove the role, and can still be banned or kicked until "
+            "this report is dismissed."
+        )
+
+    async def refresh_raid(self) -> None:
+        """
+        Updates the raid report with the latest counts, and ends the raid if no
+        members have joined recently.
+        """
+        if not self.raid:
+            return
+        if time.monotonic() - self.raid.last_join >= self.raid_cooldown:
+            await self.end_raid()
+            return
+        if self.raid.report:
+            embed = self.raid.report.embeds[0]
+            embed.description = self.summary()
+            await self.raid.report.edit(embed=embed)
+
+    async def end_raid(self) -> None:
+        """
+        Ends the current raid, updating the raid report with a final summary.
+        Flagged members stay quarantined until staff remove the role, and can be
+        banned or kicked from the report until staff dismiss it.
+        """
+        if not self.raid:
+            return
+        raid, summary = self.raid, self.summary(ongoing=False)
+        self.raid = None
+        self.joins.clear()
+        logger.info(f"Raid ended with {len(raid.flagged)} members flagged.")
+
+        if raid.report:
+            embed = raid.report.embeds[0]
+            embed.title = "Raid Ended"
+            embed.description = summary
+            embed.color = discord.Color.dark_gray()
+            await raid.report.edit(embed=embed, view=RaidReport(self, raid, True))
+
+    async def dismiss(self, raid: Raid) -> None:
+        """
+        Dismisses the report of an ended raid, forgetting its flagged members.
+
+        Args:
+            raid: The raid whose report was dismissed.
+        """
+        raid.flagged.clear()
+        if raid.report:
+            await raid.report.edit(view=None)
+
+    async def clean_welcome_channel(self, guild: discord.Guild, ids: set[int]):
+        """
+        Deletes the recent messages in the welcome channel which were sent by or
+        mention members removed by a raid cleanup, in bulk, rather than searching
+        the channel once per member as they leave.
+        """
+        welcome_channel = discord.utils.get(guild.text_channels, name=CHANNEL_WELCOME)
+        if not isinstance(welcome_channel, discord.TextChannel):
+            return
+        try:
+            await welcome_channel.purge(
+                check=lambda message: not message.pinned
+                and (
+                    message.author.id in ids
+                    or any(user.id in ids for user in message.mentions)
+                ),
+                reason="Raid cleanup",
+            )
+        except discord.HTTPException as e:
+            logger.warning(f"Could not clean the welcome channel after a raid: {e}")
+
+    async def ban_flagged(
+        self,
+        raid: Raid,
+        moderator: discord.abc.User,
+    ) -> tuple[int, int]:
+        """
+        Bans every flagged member of a raid, in bulk ban requests made with
+        bounded concurrency. The members are not logged as leaving one by one.
+
+        Args:
+            raid: The raid whose flagged members should be banned.
+            moderator: The staff member who requested the bans.
+
+        Returns:
+            The number of members banned, and the number that could not be banned.
+        """
+        if not raid.flagged:
+            return 0, 0
+        guild = self.bot.get_guild(env.server_id)
+        assert isinstance(guild, discord.Guild)
+
+        members = list(raid.flagged.values())
+        self.removing.update(raid.flagged)
+        semaphore = asyncio.Semaphore(self.raid_concurrency)
+
+        async def ban_chunk(chunk: list[discord.Member]) -> tuple[int, int]:
+            async with semaphore:
+                try:
+                    result = await guild.bulk_ban(
+                        chunk,
+                        reason=f"Raid cleanup by {moderator}",
+                        delete_message_seconds=3600,
+                    )
+                except discord.HTTPException as e:
+                    logger.warning(f"Could not ban {len(chunk)} raid members: {e}")
+                    self.removing.difference_update(member.id for member in chunk)
+                    return 0, len(chunk)
+            self.removing.difference_update(user.id for user in result.failed)
+            return len(result.banned), len(result.failed)
+
+        results = await asyncio.gather(
+            *(
+                ban_chunk(members[start : start + self.bulk_ban_size])
+                for start in range(0, len(members), self.bulk_ban_size)
+            ),
+        )
+        await self.clean_welcome_channel(guild, {member.id for member in members})
+        raid.flagged.clear()
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+    async def kick_flagged(
+        self,
+        raid: Raid,
+        moderator: discord.abc.User,
+    ) -> tuple[int, int]:
+        """
+        Kicks every flagged member of a raid, with bounded concurrency. The
+        members are not logged as leaving one by one.
+
+        Args:
+            raid: The raid whose flagged members should be kicked.
+            moderator: The staff member who requested the kicks.
+
+        Returns:
+            The number of members kicked, and the number that could not be kicked.
+        """
+        if not raid.flagged:
+            return 0, 0
+        guild = self.bot.get_guild(env.server_id)
+        assert isinstance(guild, discord.Guild)
+
+        members = list(raid.flagged.values())
+        self.removing.update(raid.flagged)
+        semaphore = asyncio.Semaphore(self.raid_concurrency)
+
+        async def kick(member: discord.Member) -> bool:
+            async with semaphore:
+                try:
+                    await member.kick(reason=f"Raid cleanup by {moderator}")
+                except discord.HTTPException:
+                    self.removing.discard(member.id)
+                    return False
+            return True
+
+        results = await asyncio.gather(*(kick(member) for member in members))
+        await self.clean_welcome_channel(guild, {member.id for member in members})
+        raid.flagged.clear()
+        return results.count(True), results.count(False)
+
+
+async def setup(bot: PiBot):
+    await bot.add_cog(RaidManager(bot))
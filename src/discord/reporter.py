@@ -6,19 +6,21 @@ from __future__ import annotations
 
 import datetime
 import json
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 from env import env
-from src.discord.globals import CHANNEL_CLOSED_REPORTS
+from src.discord.globals import CHANNEL_CLOSED_REPORTS, EMOJI_LOADING
 from src.discord.invitationals import Invitational, update_invitational_list
 
 if TYPE_CHECKING:
     from bot import PiBot
 
+    from .raid import Raid, RaidManager
+
 
 class IgnoreButton(discord.ui.Button):
     """
@@ -347,6 +349,95 @@ class InvitationalArchive(discord.ui.View):
         super().add_item(InvitationalExtendButton(self))
 
 
+class RaidActionButton(discord.ui.Button):
+    """
+    Discord button which allows a staff member to ban or kick every member flagged
+    during a raid at once, to end the raid, or to dismiss the report once the raid
+    has ended.
+    """
+
+    report_view: RaidReport
+    action: Literal["ban", "kick", "end", "dismiss"]
+
+    def __init__(
+        self,
+        view: RaidReport,
+        action: Literal["ban", "kick", "end", "dismiss"],
+        label: str,
+        style: discord.ButtonStyle,
+    ):
+        self.report_view = view
+        self.action = action
+        super().__init__(style=style, label=label, custom_id=f"raid:{action}")
+
+    async def callback(self, interaction: discord.Interaction):
+        raid_cog, raid = self.report_view.raid_cog, self.report_view.raid
+        if self.action == "end":
+            await interaction.response.send_message("Ended the raid.", ephemeral=True)
+            await raid_cog.end_raid()
+            return
+        if self.action == "dismiss":
+            await interaction.response.send_message(
+                "Dismissed the raid report.",
+                ephemeral=True,
+            )
+            await raid_cog.dismiss(raid)
+            return
+
+        await interaction.response.send_message(
+            f"{EMOJI_LOADING} Attempting to {self.action} all flagged members...",
+            ephemeral=True,
+        )
+        if self.action == "ban":
+            succeeded, failed = await raid_cog.ban_flagged(raid, interaction.user)
+            verb = "banned"
+        else:
+            succeeded, failed = await raid_cog.kick_flagged(raid, interaction.user)
+            verb = "kicked"
+        await interaction.edit_original_response(
+            content=f"{succeeded} flagged members were {verb}, and {failed} could not be {verb}.",
+        )
+
+        # Send an informational message about the cleanup
+        closed_reports = discord.utils.get(
+            interaction.guild.text_channels,
+            name=CHANNEL_CLOSED_REPORTS,
+        )
+        await closed_reports.send(
+            f"**Raid members were {verb}** by {interaction.user.mention} - {succeeded} members flagged during a raid were {verb}, and {failed} could not be {verb}.",
+        )
+
+
+class RaidReport(discord.ui.View):
+    """
+    Discord view representing a report of an ongoing or ended raid.
+    """
+
+    raid_cog: RaidManager
+    raid: Raid
+
+    def __init__(self, raid_cog: RaidManager, raid: Raid, ended: bool = False):
+        self.raid_cog = raid_cog
+        self.raid = raid
+        super().__init__(timeout=86400)
+
+        # Add relevant buttons
+        super().add_item(
+            RaidActionButton(self, "ban", "Ban Flagged", discord.ButtonStyle.red),
+        )
+        super().add_item(
+            RaidActionButton(self, "kick", "Kick Flagged", discord.ButtonStyle.red),
+        )
+        if ended:
+            super().add_item(
+                RaidActionButton(self, "dismiss", "Dismiss", discord.ButtonStyle.gray),
+            )
+        else:
+            super().add_item(
+                RaidActionButton(self, "end", "End Raid", discord.ButtonStyle.gray),
+            )
+
+
 class Reporter(commands.Cog):
     """
     Cog containing functionality related to reporting on server events.
@@ -408,12 +499,42 @@ class Reporter(commands.Cog):
             view=InnapropriateUsername(member, 123, offending_username),
         )
 
+    async def create_raid_report(self, raid_cog: RaidManager) -> discord.Message:
+        """
+        Creates a single report for an ongoing raid, which is kept up to date with
+        the number of members flagged and quarantined.
+
+        Args:
+            raid_cog: The cog handling the raid.
+
+        Returns:
+            The report message.
+        """
+        guild: discord.Guild = self.bot.get_guild(env.server_id)
+        reports_channel: discord.TextChannel = discord.utils.get(
+            guild.text_channels,
+            name="reports",
+        )
+
+        # Assemble relevant embed
+        embed = discord.Embed(
+            title="Raid Detected",
+            color=discord.Color.brand_red(),
+            description=raid_cog.summary(),
+        )
+        assert raid_cog.raid is not None
+        return await reports_channel.send(
+            embed=embed,
+            view=RaidReport(raid_cog, raid_cog.raid),
+        )
+
     async def create_cron_task_report(self, task: dict) -> None:
         """
-        Creates a report that an error with a CRON task occurred.
+        Creates a report that a CRON task failed too many times, and was moved to
+        the failed CRON tasks.
 
         Args:
-            task: The dictionary containing the CRON task.
+            task: The dictionary containing the failed CRON task.
         """
         guild: discord.Guild = self.bot.get_guild(env.server_id)
         reports_channel: discord.TextChannel = discord.utils.get(
@@ -421,23 +542,25 @@ class Reporter(commands.Cog):
             name="reports",
         )
 
-        # Serialize values
+        # Serialize values, leaving the given task as it is
+        task = dict(task)
         task["_id"] = str(task["_id"])  # ObjectID is not serializable by default
-        if "time" in task:
-            task["time"] = datetime.datetime.strftime(
-                task["time"],
-                "%m/%d/%Y, %H:%M:%S",
-            )  # datetime.datetime is not serializable by default
+        for field in ("time", "failed_at"):
+            if field in task:
+                task[field] = datetime.datetime.strftime(
+                    task[field],
+                    "%m/%d/%Y, %H:%M:%S",
+                )  # datetime.datetime is not serializable by default
 
         # Assemble the embed
         embed = discord.Embed(
             title="Error with CRON Task",
             description=f"""
-            There was an error with the following CRON task:
+            The following CRON task failed {task.get('attempts', 1)} times, and was moved to the `cron_failed` collection:
             ```python
             {json.dumps(task, indent = 4)}
             ```
-            Because this likely a development error, no actions can immediately be taken. Please contact a developer to learn more.
+            Because this likely a development error, the task will not be retried. Please contact a developer to learn more.
             """,
             color=discord.Color.brand_red(),
         )
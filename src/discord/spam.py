@@ -1,59 +1,301 @@
 from __future__ import annotations
 
+import collections
 import datetime
-from typing import TYPE_CHECKING
+import logging
+import time
+from typing import TYPE_CHECKING, ClassVar
 
 import discord
 from discord.ext import commands
 
 from env import env
 from src.discord.globals import ROLE_MUTED
+from src.features import MessageFeatures
+from src.minhash import MinHashIndex
 
 if TYPE_CHECKING:
     from bot import PiBot
     from src.discord.reporter import Reporter
     from src.discord.tasks import CronTasks
 
+logger = logging.getLogger(__name__)
+
+
+class AuthorHistory:
+    """
+    A time-windowed ring buffer of one author's recent messages.
+
+    Counts of each content digest and of messages containing caps are updated as
+    messages enter and leave the buffer, so checking a new message against the
+    author's history takes constant time.
+    """
+
+    entries: collections.deque[tuple[float, bytes, bool]]
+    digests: collections.Counter[bytes]
+    caps_count: int
+
+    def __init__(self):
+        self.entries = collections.deque()
+        self.digests = collections.Counter()
+        self.caps_count = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, timestamp: float, digest: bytes, caps: bool, limit: int) -> None:
+        """
+        Adds a message to the history, evicting the oldest message if the history
+        holds more than limit messages.
+        """
+        self.entries.append((timestamp, digest, caps))
+        self.digests[digest] += 1
+        self.caps_count += caps
+        if len(self.entries) > limit:
+            self._pop()
+
+    def expire(self, cutoff: float) -> None:
+        """
+        Removes all messages sent before the cutoff.
+        """
+        while self.entries and self.entries[0][0] < cutoff:
+            self._pop()
+
+    def _pop(self) -> None:
+        _, digest, caps = self.entries.popleft()
+        self.digests[digest] -= 1
+        if not self.digests[digest]:
+            del self.digests[digest]
+        self.caps_count -= caps
+
+
+class TokenBucket:
+    """
+    A token bucket which refills lazily: tokens are only added when the bucket is
+    used, based on the time since it was last used.
+
+    The times of messages sent while the bucket was empty are kept, so that
+    messages sent steadily over the limit are counted even when some of them get
+    a token. Alerts about the bucket are sent once, until the bucket has refilled
+    or the alert cooldown has passed.
+    """
+
+    tokens: float
+    updated: float
+    overflows: collections.deque[float]  # When messages were sent while empty
+    alerted: float | None  # When an alert about the bucket was last sent
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+        self.overflows = collections.deque()
+        self.alerted = None
+
+    def refill(self, now: float, capacity: float, rate: float) -> None:
+        """
+        Adds the tokens accumulated since the bucket was last used. A bucket which
+        has fully refilled forgets its overflows and alerts.
+        """
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= capacity:
+            self.overflows.clear()
+            self.alerted = None
+
+    def consume(self, now: float, capacity: float, rate: float) -> bool:
+        """
+        Takes one token from the bucket.
+
+        Returns:
+            Whether a token was available.
+        """
+        self.refill(now, capacity, rate)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.overflows.append(now)
+        return False
+
+    def overflow_count(self, now: float, window: float) -> int:
+        """
+        Returns the number of messages sent while the bucket was empty within the
+        last window seconds.
+        """
+        while self.overflows and self.overflows[0] <= now - window:
+            self.overflows.popleft()
+        return len(self.overflows)
+
+    def should_alert(self, now: float, cooldown: float) -> bool:
+        """
+        Returns whether an alert about the bucket should be sent, recording that it
+        was sent if so.
+        """
+        if self.alerted is not None and now - self.alerted < cooldown:
+            return False
+        self.alerted = now
+        return True
+
+
+class ChannelVelocity:
+    """
+    Counts the messages sent in a channel over a sliding window, using a ring of
+    fixed-length time buckets.
+    """
+
+    bucket_seconds: int
+    counts: list[int]
+    slots: list[int]  # The time slot each bucket is currently counting
+
+    def __init__(self, buckets: int = 6, bucket_seconds: int = 10):
+        self.bucket_seconds = bucket_seconds
+        self.counts = [0] * buckets
+        self.slots = [-1] * buckets
+
+    def add(self, now: float) -> None:
+        """
+        Counts a message sent at the given time.
+        """
+        slot = int(now // self.bucket_seconds)
+        index = slot % len(self.counts)
+        if self.slots[index] != slot:
+            self.slots[index] = slot
+            self.counts[index] = 0
+        self.counts[index] += 1
+
+    def rate(self, now: float) -> float:
+        """
+        Returns the number of messages sent per minute over the window.
+        """
+        slot = int(now // self.bucket_seconds)
+        total = sum(
+            count
+            for count, count_slot in zip(self.counts, self.slots)
+            if slot - count_slot < len(self.counts)
+        )
+        return total * 60 / (len(self.counts) * self.bucket_seconds)
+
 
 class SpamManager(commands.Cog):
 
-    recent_messages: list[discord.Message]
+    histories: dict[int, AuthorHistory]
+    user_buckets: dict[int, TokenBucket]
+    channel_buckets: dict[int, TokenBucket]
+    similar_messages: MinHashIndex
+    channel_velocities: dict[int, ChannelVelocity]
+    slowmode_changed: dict[int, float]
 
     # Limits
-    recent_messages_limit = 20  # The number of recent messages that are stored
+    history_window = 300  # The number of seconds that messages are stored for
+    history_limit = 50  # The number of recent messages that are stored per author
     caps_limit = 8  # The number of messages that can be sent containing caps before a mute is issued
     mute_limit = 6  # The number of messages that can be sent containing the same content before a mute is issued
     warning_limit = 3  # The number of messages that can be sent containing caps or the same content before a warning is issued to the offending user
+    similarity_min_length = 20  # The number of characters a message needs to be compared against similar messages
+    similarity_threshold = 0.6  # The estimated similarity at which messages are considered the same content
+    coordinated_limit = 3  # The number of authors that can send similar messages before staff are notified
+    flood_window = (
+        60  # The number of seconds that messages over the flood limit are counted over
+    )
+    flood_alert_cooldown = (
+        600  # The number of seconds before a flood warning or report is repeated
+    )
+
+    # Automatic slowmode
+    slowmode_steps = (
+        0,
+        5,
+        10,
+        15,
+        30,
+        60,
+        120,
+        300,
+        600,
+        900,
+        1800,
+        3600,
+        7200,
+        21600,
+    )  # The slowmode delays that channels are moved between, in seconds
+    slowmode_raise_rate = (
+        30  # The number of messages per minute at which slowmode is raised
+    )
+    slowmode_lower_rate = (
+        10  # The number of messages per minute at which slowmode is lowered
+    )
+    slowmode_hold = (
+        120  # The number of seconds slowmode is kept before it can be lowered
+    )
+
+    # Flood limits, used when the setting is not present in the settings document
+    flood_defaults: ClassVar[dict[str, float]] = {
+        "flood_user_burst": 10,  # The number of messages a user can send at once
+        "flood_user_rate": 0.5,  # The number of messages per second a user can keep sending
+        "flood_user_mute": 5,  # The number of messages a user can send over their limit within the flood window before a mute is issued
+        "flood_channel_burst": 30,  # The number of messages that can be sent in a channel at once
+        "flood_channel_rate": 2,  # The number of messages per second that can keep being sent in a channel
+    }
 
     def __init__(self, bot: PiBot):
         self.bot = bot
-        self.recent_messages = []
-
-    def has_caps(self, message: discord.Message) -> bool:
+        self.histories = {}
+        self.user_buckets = {}
+        self.channel_buckets = {}
+        self.similar_messages = MinHashIndex(window=self.history_window)
+        self.channel_velocities = {}
+        self.slowmode_changed = {}
+        self._last_prune = time.monotonic()
+
+    def flood_setting(self, name: str) -> float:
+        """
+        Returns a flood limit from the bot's settings, or its default value if it
+        has not been set.
         """
-        Returns true if the message has caps (more capitalized letters than lowercase letters)
+        value = self.bot.settings.get(name)
+        return self.flood_defaults[name] if value is None else float(value)
+
+    def find_similar_authors(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+        now: float,
+    ) -> list[int]:
         """
-        caps = False
-        upper_count = sum(1 for c in message.content if c.isupper())
-        lower_count = sum(1 for c in message.content if c.islower())
-        if upper_count > (lower_count + 3):
-            caps = True
+        Finds recent messages across the server which are nearly identical to the
+        message, and adds the message to the index of recent messages.
 
-        return caps
+        Returns:
+            The author ID of each similar message, once per message.
+        """
+        if len(features.folded) < self.similarity_min_length:
+            return []
 
-    async def check_for_repetition(self, message: discord.Message) -> None:
+        self.similar_messages.expire(now)
+        authors = self.similar_messages.search(
+            features.signature,
+            self.similarity_threshold,
+        )
+        self.similar_messages.add(now, message.author.id, features.signature)
+        return authors
+
+    async def check_for_repetition(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+        similar_authors: list[int],
+    ) -> None:
         """
         Checks to see if the message has often been repeated recently, and takes action if action is needed.
+        Messages which are nearly identical to the message count as repeats.
         """
         # Type checking
         assert isinstance(message.author, discord.Member)
 
-        matching_messages = filter(
-            lambda m: m.author == message.author
-            and m.content.lower() == message.content.lower(),
-            self.recent_messages,
+        history = self.histories[message.author.id]
+        matching_messages_count = max(
+            history.digests[features.digest],
+            similar_authors.count(message.author.id) + 1,
         )
-        matching_messages_count = len(list(matching_messages))
 
         if matching_messages_count >= self.mute_limit:
             await self.mute(message.author)
@@ -82,22 +324,20 @@ class SpamManager(commands.Cog):
                 f"{message.author.mention}, please avoid spamming. Additional spam will lead to your account being temporarily muted.",
             )
 
-    async def check_for_caps(self, message: discord.Message) -> None:
+    async def check_for_caps(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+    ) -> None:
         """
         Checks the message to see if it and recent messages contain a lot of capital letters.
         """
         # Type checking
         assert isinstance(message.author, discord.Member)
 
-        caps_messages = filter(
-            lambda m: m.author == message.author
-            and self.has_caps(m)
-            and len(m.content) > 5,
-            self.recent_messages,
-        )
-        caps_messages_count = len(list(caps_messages))
+        caps_messages_count = self.histories[message.author.id].caps_count
 
-        if caps_messages_count >= self.caps_limit and self.has_caps(message):
+        if caps_messages_count >= self.caps_limit and features.has_caps:
             await self.mute(message.author)
 
             # Send info message to channel about mute
@@ -119,11 +359,206 @@ class SpamManager(commands.Cog):
             )
             reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
             await reporter_cog.create_staff_message(staff_embed_message)
-        elif caps_messages_count >= self.warning_limit and self.has_caps(message):
+        elif caps_messages_count >= self.warning_limit and features.has_caps:
             await message.author.send(
                 f"{message.author.mention}, please avoid using all caps in your messages. Repeatedly doing so will cause your account to be temporarily muted.",
             )
 
+    async def check_for_coordination(
+        self,
+        message: discord.Message,
+        similar_authors: list[int],
+    ) -> None:
+        """
+        Checks whether several authors are sending nearly identical messages, and
+        notifies staff when a new author brings the number of authors to the limit.
+        """
+        if message.author.id in similar_authors:
+            return
+
+        authors = {*similar_authors, message.author.id}
+        if len(authors) != self.coordinated_limit:
+            return
+
+        mentions = ", ".join(f"<@{author_id}>" for author_id in authors)
+        staff_embed_message = discord.Embed(
+            title="Coordinated spam detected",
+            color=discord.Color.yellow(),
+            description=f"""
+            **{len(authors)} members** have recently sent nearly identical messages: {mentions}.
+
+            No action was taken automatically. To teleport to the latest message, please [click here]({message.jump_url}).
+            """,
+        )
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        await reporter_cog.create_staff_message(staff_embed_message)
+
+    async def check_for_flood(self, message: discord.Message, now: float) -> None:
+        """
+        Checks whether the author, or the channel as a whole, is sending messages
+        faster than the flood limits allow, and takes action if action is needed.
+        """
+        # Type checking
+        assert isinstance(message.author, discord.Member)
+
+        user_capacity = self.flood_setting("flood_user_burst")
+        user_rate = self.flood_setting("flood_user_rate")
+        user_bucket = self.user_buckets.setdefault(
+            message.author.id,
+            TokenBucket(user_capacity, now),
+        )
+        if not user_bucket.consume(now, user_capacity, user_rate):
+            if user_bucket.overflow_count(
+                now,
+                self.flood_window,
+            ) >= self.flood_setting("flood_user_mute"):
+                user_bucket.overflows.clear()
+                await self.mute(message.author)
+
+                # Send info message to channel about mute
+                info_message = await message.channel.send(
+                    f"Successfully muted {message.author.mention} for 1 hour.",
+                )
+
+                # Send info message to staff about mute
+                staff_embed_message = discord.Embed(
+                    title="Automatic mute occurred",
+                    color=discord.Color.yellow(),
+                    description=f"""
+                    {message.author.mention} was automatically muted in {message.channel} for **flooding the server with messages**. The user was **warned**, and kept sending messages faster than **{user_rate:g} messages per second** before a mute was applied.
+
+                    Their mute will automatically expire in: {discord.utils.format_dt(discord.utils.utcnow() + datetime.timedelta(hours = 1), 'R')}.
+
+                    No further action needs to be taken. To teleport to the issue, please [click here]({info_message.jump_url}). Please know that the offending messages may have been deleted by the author or staff.
+                    """,
+                )
+                reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+                await reporter_cog.create_staff_message(staff_embed_message)
+            elif user_bucket.should_alert(now, self.flood_alert_cooldown):
+                await message.author.send(
+                    f"{message.author.mention}, please slow down, you are sending messages too quickly. Continuing to flood the server will lead to your account being temporarily muted.",
+                )
+
+        channel_capacity = self.flood_setting("flood_channel_burst")
+        channel_rate = self.flood_setting("flood_channel_rate")
+        channel_bucket = self.channel_buckets.setdefault(
+            message.channel.id,
+            TokenBucket(channel_capacity, now),
+        )
+        if not channel_bucket.consume(
+            now,
+            channel_capacity,
+            channel_rate,
+        ) and channel_bucket.should_alert(now, self.flood_alert_cooldown):
+            # Notify staff once until the channel is back under its limit
+            staff_embed_message = discord.Embed(
+                title="Channel flood detected",
+                color=discord.Color.yellow(),
+                description=f"""
+                Messages are being sent in {message.channel.mention} faster than **{channel_rate:g} messages per second**.
+
+                No action was taken automatically. To teleport to the channel, please [click here]({message.jump_url}).
+                """,
+            )
+            reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+            await reporter_cog.create_staff_message(staff_embed_message)
+
+    def slowmode_target(
+        self,
+        current: int,
+        rate: float,
+        minimum: int,
+        maximum: int,
+        held: float,
+    ) -> int:
+        """
+        Determines the slowmode delay a channel should move to. The delay moves one
+        step at a time, and the gap between the rates at which it is raised and
+        lowered, along with the time it must be held before being lowered, keeps it
+        from flapping.
+
+        Args:
+            current: The current slowmode delay of the channel, in seconds.
+            rate: The number of messages per minute recently sent in the channel.
+            minimum: The smallest delay staff allow, in seconds.
+            maximum: The largest delay staff allow, in seconds.
+            held: The number of seconds since the delay was last changed.
+
+        Returns:
+            The new slowmode delay, in seconds.
+        """
+        steps = sorted(
+            {minimum, maximum}
+            | {step for step in self.slowmode_steps if minimum < step < maximum},
+        )
+        if current < minimum or current > maximum:
+            return min(max(current, minimum), maximum)
+
+        # The highest step not above the current delay
+        index = max(i for i, step in enumerate(steps) if step <= current)
+        if rate >= self.slowmode_raise_rate and index + 1 < len(steps):
+            return steps[index + 1]
+        if rate <= self.slowmode_lower_rate and held >= self.slowmode_hold:
+            return steps[max(index - 1, 0)] if steps[index] == current else steps[index]
+        return current
+
+    async def adjust_slowmode(self) -> None:
+        """
+        Raises or lowers the slowmode delay of every channel staff have enabled
+        automatic slowmode in, based on how quickly messages are being sent, and
+        notifies staff of each change.
+        """
+        guild = self.bot.get_guild(env.server_id)
+        assert isinstance(guild, discord.Guild)
+
+        now = time.monotonic()
+        for channel_id, bounds in (
+            self.bot.settings.get("auto_slowmode") or {}
+        ).items():
+            channel = guild.get_channel(int(channel_id))
+            if not isinstance(channel, discord.TextChannel):
+                continue
+
+            velocity = self.channel_velocities.get(channel.id)
+            rate = velocity.rate(now) if velocity else 0
+            current = channel.slowmode_delay
+            target = self.slowmode_target(
+                current,
+                rate,
+                bounds["min"],
+                bounds["max"],
+                now - self.slowmode_changed.get(channel.id, 0),
+            )
+            if target == current:
+                continue
+
+            # A failure in one channel must not stop the loop for every channel
+            try:
+                await channel.edit(slowmode_delay=target)
+            except discord.HTTPException as e:
+                logger.warning(f"Could not change slowmode in #{channel}: {e}")
+                continue
+            self.slowmode_changed[channel.id] = now
+            logger.info(
+                f"Changed slowmode in #{channel} from {current} to {target} seconds "
+                f"at {rate:.0f} messages per minute.",
+            )
+
+            staff_embed_message = discord.Embed(
+                title="Automatic slowmode changed",
+                color=discord.Color.yellow(),
+                description=f"""
+                The slowmode delay in {channel.mention} was **{'raised' if target > current else 'lowered'}** from **{current} seconds** to **{target} seconds**, as **{rate:.0f} messages per minute** were recently sent.
+
+                The delay will be kept between {bounds['min']} and {bounds['max']} seconds. To stop adjusting the delay automatically, use `/slowmode remove`.
+                """,
+            )
+            reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+            try:
+                await reporter_cog.create_staff_message(staff_embed_message)
+            except discord.HTTPException as e:
+                logger.warning(f"Could not report slowmode change in #{channel}: {e}")
+
     async def mute(self, member: discord.Member) -> None:
         """
         Mutes the user and schedules an unmute for an hour later in CRON.
@@ -139,22 +574,77 @@ class SpamManager(commands.Cog):
         await cron_cog.schedule_unmute(member, unmute_time)
         await member.add_roles(muted_role)
 
-    async def store_and_validate(self, message: discord.Message) -> None:
+    def prune_histories(self, now: float) -> None:
+        """
+        Removes the histories of authors who have not sent a message within the
+        history window, and flood buckets which have fully refilled. Runs at most
+        once per window.
         """
-        Stores a message in recent_messages and validates whether the message is spam or not.
+        if now - self._last_prune < self.history_window:
+            return
+        self._last_prune = now
+
+        cutoff = now - self.history_window
+        for author_id, history in list(self.histories.items()):
+            history.expire(cutoff)
+            if not len(history):
+                del self.histories[author_id]
+
+        # Full buckets are the same as new buckets, so they do not need to be kept
+        for buckets, capacity, rate in (
+            (
+                self.user_buckets,
+                self.flood_setting("flood_user_burst"),
+                self.flood_setting("flood_user_rate"),
+            ),
+            (
+                self.channel_buckets,
+                self.flood_setting("flood_channel_burst"),
+                self.flood_setting("flood_channel_rate"),
+            ),
+        ):
+            for key, bucket in list(buckets.items()):
+                bucket.refill(now, capacity, rate)
+                if bucket.tokens >= capacity:
+                    del buckets[key]
+
+    async def store_and_validate(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+    ) -> None:
+        """
+        Stores a message in its author's history and validates whether the message is spam or not.
         """
         # No need to take action for bots
         if message.author.bot:
             return
 
-        # Store message
-        self.recent_messages.insert(0, message)
-        self.recent_messages = self.recent_messages[
-            : self.recent_messages_limit
-        ]  # Only store 20 recent messages at once
+        # Store message in the author's history
+        now = time.monotonic()
+        history = self.histories.setdefault(message.author.id, AuthorHistory())
+        history.expire(now - self.history_window)
+        history.add(
+            now,
+            features.digest,
+            features.has_caps and len(features.content) > 5,
+            self.history_limit,
+        )
+        self.prune_histories(now)
+
+        # Track the message rate of channels with automatic slowmode
+        if str(message.channel.id) in (self.bot.settings.get("auto_slowmode") or {}):
+            self.channel_velocities.setdefault(
+                message.channel.id,
+                ChannelVelocity(),
+            ).add(now)
+
+        similar_authors = self.find_similar_authors(message, features, now)
 
-        await self.check_for_repetition(message)
-        await self.check_for_caps(message)
+        await self.check_for_repetition(message, features, similar_authors)
+        await self.check_for_coordination(message, similar_authors)
+        await self.check_for_caps(message, features)
+        await self.check_for_flood(message, now)
 
 
 async def setup(bot: PiBot):
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from typing import TYPE_CHECKING, Literal
 
 import discord
@@ -14,15 +15,48 @@ from src.discord.globals import (
     ROLE_STAFF,
     ROLE_VIP,
 )
+from src.links import normalize_domain
+from src.regexpool import RegexPoolBusy, RegexPoolError
 
 if TYPE_CHECKING:
     from bot import PiBot
+    from src.discord.censor import Censor
 
 
 class StaffCensor(commands.Cog):
     def __init__(self, bot: PiBot):
         self.bot = bot
 
+    async def backtest_rejection(self, phrase: str) -> tuple[str, bool] | None:
+        """
+        Backtests a proposed censor word, returning the reason it should not be
+        added to the censor list, or None if it can be added.
+
+        Returns:
+            The reason, and whether staff can force the word to be added anyway.
+            Words which match many recent messages or are slow to match can be
+            forced, as they may be the words most in need of censoring during a
+            spam wave.
+        """
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        try:
+            backtest = await censor_cog.backtest(phrase)
+        except asyncio.TimeoutError:
+            return "it took too long to run against recent messages", False
+        except RegexPoolBusy:
+            return "the bot is too busy to test it right now (please try again)", False
+        except RegexPoolError:
+            return "it is not a valid regular expression", False
+        censor_cog.refresh_matcher()
+        conflict = censor_cog.matcher.conflict(phrase)
+        if conflict:
+            return (
+                f"it cannot be combined with the other censor words ({conflict})",
+                False,
+            )
+        rejection = censor_cog.backtest_rejection(backtest)
+        return (rejection, True) if rejection else None
+
     censor_group = app_commands.Group(
         name="censor",
         description="Controls Pi-Bot's censor.",
@@ -36,14 +70,16 @@ class StaffCensor(commands.Cog):
     )
     @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
     @app_commands.describe(
-        censor_type="Whether to add a new word or emoji to the list.",
-        phrase="The new word or emoji to add. For a new word, type the word. For a new emoji, send the emoji.",
+        censor_type="Whether to add a new word, emoji or domain to the list.",
+        phrase="The new word, emoji or domain to add. For a new word, type the word. For a new emoji, send the emoji.",
+        force="Whether to add a word even if it matches many recent messages or is slow to match.",
     )
     async def censor_add(
         self,
         interaction: discord.Interaction,
-        censor_type: Literal["word", "emoji"],
+        censor_type: Literal["word", "emoji", "domain"],
         phrase: str,
+        force: bool = False,
     ):
         # Check for staff permissions
         commandchecks.is_staff_from_ctx(interaction)
@@ -54,39 +90,71 @@ class StaffCensor(commands.Cog):
         )
 
         if censor_type == "word":
-            if phrase in src.discord.globals.CENSOR["words"]:
+            if phrase in src.discord.globals.CENSOR.words:
                 await interaction.edit_original_response(
                     content=f"`{phrase}` is already in the censored words list. Operation cancelled.",
                 )
+            elif (rejection := await self.backtest_rejection(phrase)) and not (
+                force and rejection[1]
+            ):
+                reason, can_force = rejection
+                await interaction.edit_original_response(
+                    content=f"`{phrase}` was not added to the censor list because {reason}. "
+                    "Use `/censor backtest` to learn more"
+                    + (", or `force` to add it anyway." if can_force else "."),
+                )
             else:
-                src.discord.globals.CENSOR["words"].append(phrase)
+                src.discord.globals.CENSOR.add("words", phrase)
                 await self.bot.mongo_database.update(
                     "data",
                     "censor",
-                    src.discord.globals.CENSOR["_id"],
+                    src.discord.globals.CENSOR._id,
                     {"$push": {"words": phrase}},
                 )
                 first_letter = phrase[0]
                 last_letter = phrase[-1]
+                warning = (
+                    f" Note that {rejection[0]}, so check that it is not censoring "
+                    "messages it should not."
+                    if rejection
+                    else ""
+                )
                 await interaction.edit_original_response(
-                    content=f"Added `{first_letter}...{last_letter}` to the censor list.",
+                    content=f"Added `{first_letter}...{last_letter}` to the censor list.{warning}",
                 )
         elif censor_type == "emoji":
-            if phrase in src.discord.globals.CENSOR["emojis"]:
+            if phrase in src.discord.globals.CENSOR.emojis:
                 await interaction.edit_original_response(
                     content="Emoji is already in the censored emoijs list. Operation cancelled.",
                 )
             else:
-                src.discord.globals.CENSOR["emojis"].append(phrase)
+                src.discord.globals.CENSOR.add("emojis", phrase)
                 await self.bot.mongo_database.update(
                     "data",
                     "censor",
-                    src.discord.globals.CENSOR["_id"],
+                    src.discord.globals.CENSOR._id,
                     {"$push": {"emojis": phrase}},
                 )
                 await interaction.edit_original_response(
                     content="Added emoji to the censor list.",
                 )
+        elif censor_type == "domain":
+            domain = normalize_domain(phrase)
+            if domain in src.discord.globals.CENSOR.domains:
+                await interaction.edit_original_response(
+                    content=f"`{domain}` is already in the blocked domains list. Operation cancelled.",
+                )
+            else:
+                src.discord.globals.CENSOR.add("domains", domain)
+                await self.bot.mongo_database.update(
+                    "data",
+                    "censor",
+                    src.discord.globals.CENSOR._id,
+                    {"$push": {"domains": domain}},
+                )
+                await interaction.edit_original_response(
+                    content=f"Added `{domain}` to the blocked domains list.",
+                )
 
     @censor_group.command(
         name="remove",
@@ -94,13 +162,13 @@ class StaffCensor(commands.Cog):
     )
     @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
     @app_commands.describe(
-        censor_type="Whether to remove a word or emoji.",
-        phrase="The word or emoji to remove from the censor list.",
+        censor_type="Whether to remove a word, emoji or domain.",
+        phrase="The word, emoji or domain to remove from the censor list.",
     )
     async def censor_remove(
         self,
         interaction: discord.Interaction,
-        censor_type: Literal["word", "emoji"],
+        censor_type: Literal["word", "emoji", "domain"],
         phrase: str,
     ):
         # Check for staff permissions again
@@ -112,37 +180,243 @@ class StaffCensor(commands.Cog):
         )
 
         if censor_type == "word":
-            if phrase not in src.discord.globals.CENSOR["words"]:
+            if phrase not in src.discord.globals.CENSOR.words:
                 await interaction.edit_original_response(
                     content=f"`{phrase}` is not in the list of censored words.",
                 )
             else:
-                src.discord.globals.CENSOR["words"].remove(phrase)
+                src.discord.globals.CENSOR.remove("words", phrase)
                 await self.bot.mongo_database.update(
                     "data",
                     "censor",
-                    src.discord.globals.CENSOR["_id"],
+                    src.discord.globals.CENSOR._id,
                     {"$pull": {"words": phrase}},
                 )
                 await interaction.edit_original_response(
                     content=f"Removed `{phrase}` from the censor list.",
                 )
         elif censor_type == "emoji":
-            if phrase not in src.discord.globals.CENSOR["emojis"]:
+            if phrase not in src.discord.globals.CENSOR.emojis:
                 await interaction.edit_original_response(
                     content=f"{phrase} is not in the list of censored emojis.",
                 )
             else:
-                src.discord.globals.CENSOR["emojis"].remove(phrase)
+                src.discord.globals.CENSOR.remove("emojis", phrase)
                 await self.bot.mongo_database.update(
                     "data",
                     "censor",
-                    src.discord.globals.CENSOR["_id"],
+                    src.discord.globals.CENSOR._id,
                     {"$pull": {"emojis": phrase}},
                 )
                 await interaction.edit_original_response(
                     content=f"Removed {phrase} from the emojis list.",
                 )
+        elif censor_type == "domain":
+            domain = normalize_domain(phrase)
+            if domain not in src.discord.globals.CENSOR.domains:
+                await interaction.edit_original_response(
+                    content=f"`{domain}` is not in the list of blocked domains.",
+                )
+            else:
+                src.discord.globals.CENSOR.remove("domains", domain)
+                await self.bot.mongo_database.update(
+                    "data",
+                    "censor",
+                    src.discord.globals.CENSOR._id,
+                    {"$pull": {"domains": domain}},
+                )
+                await interaction.edit_original_response(
+                    content=f"Removed `{domain}` from the blocked domains list.",
+                )
+
+    @censor_group.command(
+        name="addimage",
+        description="Staff command. Flags an image so that matching uploads are removed.",
+    )
+    @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
+    @app_commands.describe(image="The image to flag.")
+    async def censor_add_image(
+        self,
+        interaction: discord.Interaction,
+        image: discord.Attachment,
+    ):
+        # Check for staff permissions
+        commandchecks.is_staff_from_ctx(interaction)
+
+        # Send notice message
+        await interaction.response.send_message(
+            f"{EMOJI_LOADING} Attempting to flag image.",
+            ephemeral=True,
+        )
+
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        value = await censor_cog.hash_attachment(image)
+        if value is None:
+            return await interaction.edit_original_response(
+                content="This attachment could not be read as an image. Operation cancelled.",
+            )
+        if value in censor_cog.image_hashes:
+            return await interaction.edit_original_response(
+                content="This image is already flagged. Operation cancelled.",
+            )
+
+        censor_cog.add_image_hash(value)
+        await self.bot.mongo_database.insert(
+            "data",
+            "image_hashes",
+            {"hash": f"{value:016x}", "added_by": interaction.user.id},
+        )
+        await interaction.edit_original_response(
+            content="Flagged the image. Matching uploads will now be removed.",
+        )
+
+    @censor_group.command(
+        name="removeimage",
+        description="Staff command. Unflags an image and any similar flagged images.",
+    )
+    @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
+    @app_commands.describe(image="The image to unflag.")
+    async def censor_remove_image(
+        self,
+        interaction: discord.Interaction,
+        image: discord.Attachment,
+    ):
+        # Check for staff permissions
+        commandchecks.is_staff_from_ctx(interaction)
+
+        # Send notice message
+        await interaction.response.send_message(
+            f"{EMOJI_LOADING} Attempting to unflag image.",
+            ephemeral=True,
+        )
+
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        value = await censor_cog.hash_attachment(image)
+        if value is None:
+            return await interaction.edit_original_response(
+                content="This attachment could not be read as an image. Operation cancelled.",
+            )
+        matches = censor_cog.image_index.search(value, censor_cog.image_max_distance)
+        if not matches:
+            return await interaction.edit_original_response(
+                content="This image is not flagged.",
+            )
+
+        censor_cog.remove_image_hashes(matches)
+        await self.bot.mongo_database.delete_by(
+            "data",
+            "image_hashes",
+            {"hash": {"$in": [f"{match:016x}" for match in matches]}},
+        )
+        await interaction.edit_original_response(
+            content=f"Unflagged `{len(matches)}` matching images.",
+        )
+
+    @censor_group.command(
+        name="backtest",
+        description="Staff command. Tests a proposed censor word against recent messages.",
+    )
+    @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
+    @app_commands.describe(phrase="The proposed word to test.")
+    async def censor_backtest(self, interaction: discord.Interaction, phrase: str):
+        # Check for staff permissions
+        commandchecks.is_staff_from_ctx(interaction)
+
+        # Send notice message
+        await interaction.response.send_message(
+            f"{EMOJI_LOADING} Testing `{phrase}` against recent messages.",
+            ephemeral=True,
+        )
+
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        try:
+            backtest = await censor_cog.backtest(phrase)
+        except asyncio.TimeoutError:
+            return await interaction.edit_original_response(
+                content=f"`{phrase}` took too long to run against recent messages, and would not be accepted.",
+            )
+        except RegexPoolBusy:
+            return await interaction.edit_original_response(
+                content="The censor is busy, so the word could not be tested. Please try again.",
+            )
+        except RegexPoolError:
+            return await interaction.edit_original_response(
+                content=f"`{phrase}` is not a valid regular expression.",
+            )
+
+        rejection = censor_cog.backtest_rejection(backtest)
+        verdict = (
+            f"Would be rejected, because {rejection}."
+            if rejection
+            else "Would be accepted."
+        )
+        match_rate = (
+            backtest["hits"] / backtest["corpus_size"] if backtest["corpus_size"] else 0
+        )
+        samples = "\n".join(
+            f"> {discord.utils.escape_markdown(sample[:100])}"
+            for sample in backtest["samples"]
+        )
+        embed = discord.Embed(
+            title=f"Censor Backtest for `{phrase}`",
+            color=discord.Color.brand_red()
+            if rejection
+            else discord.Color.brand_green(),
+            description=f"""
+            **Matched:** {backtest['hits']} of the last {backtest['corpus_size']} messages ({match_rate:.2%})
+            **Match cost:** {backtest['p50_ns'] / 1000:.1f}μs (p50), {backtest['p99_ns'] / 1000:.1f}μs (p99)
+            **Verdict:** {verdict}
+            """,
+        )
+        if samples:
+            embed.add_field(name="Sample matches", value=samples[:1024])
+        await interaction.edit_original_response(content=None, embed=embed)
+
+    @censor_group.command(
+        name="audit",
+        description="Staff command. Checks all members' names against the censor.",
+    )
+    @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
+    async def censor_audit(self, interaction: discord.Interaction):
+        # Check for staff permissions
+        commandchecks.is_staff_from_ctx(interaction)
+
+        # Send notice message
+        await interaction.response.send_message(
+            f"{EMOJI_LOADING} Checking all members' names against the censor.",
+        )
+
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        reports = await censor_cog.audit_usernames(interaction.guild)
+        await interaction.edit_original_response(
+            content=f"Checked all members' names. Filed `{reports}` new reports.",
+        )
+
+    @censor_group.command(
+        name="stats",
+        description="Staff command. Shows statistics about the censor.",
+    )
+    @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
+    async def censor_stats(self, interaction: discord.Interaction):
+        # Check for staff permissions
+        commandchecks.is_staff_from_ctx(interaction)
+
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        cache = censor_cog.cache
+        lookups = cache.hits + cache.misses
+        hit_rate = cache.hits / lookups if lookups else 0
+        pool_stats = self.bot.regex_pool.stats
+
+        embed = discord.Embed(
+            title="Censor Statistics",
+            color=discord.Color.brand_red(),
+            description=f"""
+            **Censor list version:** {censor_cog.matcher.version}
+            **Cache:** {cache.hits} hits, {cache.misses} misses ({hit_rate:.1%} hit rate), {len(cache)}/{cache.maxsize} entries
+            **Regex pool:** {pool_stats['completed']} completed, {pool_stats['timeouts']} timeouts, {pool_stats['errors']} errors, {pool_stats['restarts']} worker restarts, {pool_stats['busy']} with no free worker
+            """,
+        )
+        await interaction.response.send_message(embed=embed)
 
 
 async def setup(bot: PiBot):
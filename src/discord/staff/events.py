@@ -15,6 +15,7 @@ from src.discord.globals import (
     ROLE_STAFF,
     ROLE_VIP,
 )
+from src.store import Event
 
 if TYPE_CHECKING:
     from bot import PiBot
@@ -55,7 +56,7 @@ class StaffEvents(commands.Cog):
         )
 
         # Check to see if event has already been added.
-        if event_name in [e["name"] for e in src.discord.globals.EVENT_INFO]:
+        if event_name in src.discord.globals.EVENT_INFO:
             return await interaction.edit_original_response(
                 content=f"The `{event_name}` event has already been added.",
             )
@@ -68,8 +69,10 @@ class StaffEvents(commands.Cog):
         new_dict = {"name": event_name, "aliases": aliases_array}
 
         # Add dict into events container
-        src.discord.globals.EVENT_INFO.append(new_dict)
         await self.bot.mongo_database.insert("data", "events", new_dict)
+        # The change stream may have added the event already
+        if event_name not in src.discord.globals.EVENT_INFO:
+            src.discord.globals.EVENT_INFO.add(Event.from_document(new_dict))
 
         # Create role on server
         server = self.bot.get_guild(env.server_id)
@@ -109,9 +112,7 @@ class StaffEvents(commands.Cog):
         )
 
         # Check to make sure event has previously been added
-        event_not_in_list = event_name not in [
-            e["name"] for e in src.discord.globals.EVENT_INFO
-        ]
+        event_not_in_list = event_name not in src.discord.globals.EVENT_INFO
 
         # Check to see if role exists on server
         server = self.bot.get_guild(env.server_id)
@@ -135,11 +136,8 @@ class StaffEvents(commands.Cog):
                 )
 
         # Complete operation of removing event
-        event = next(
-            e for e in src.discord.globals.EVENT_INFO if e["name"] == event_name
-        )
-        src.discord.globals.EVENT_INFO.remove(event)
-        await self.bot.mongo_database.delete("data", "events", event["_id"])
+        event = src.discord.globals.EVENT_INFO.remove(event_name)
+        await self.bot.mongo_database.delete("data", "events", event._id)
 
         # Notify staff member of completion
         if delete_role == "yes":
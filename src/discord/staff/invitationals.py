@@ -654,12 +654,13 @@ class StaffInvitational(commands.Cog):
             # Remove voters from all tourneys
             invitationals = await self.bot.mongo_database.get_invitationals()
             for invitational in invitationals:
-                await self.bot.mongo_database.update(
+                self.bot.mongo_database.queue_update(
                     "data",
-                    "tournaments",
+                    "invitationals",
                     invitational["_id"],
                     {"$set": {"voters": []}},
                 )
+            await self.bot.mongo_database.flush()
 
             # Update the invitational list to reflect
             await update_invitational_list(self.bot, {})
@@ -14,6 +14,7 @@ from src.discord.globals import (
     ROLE_STAFF,
     ROLE_VIP,
 )
+from src.store import Tag
 
 if TYPE_CHECKING:
     from bot import PiBot
@@ -56,7 +57,7 @@ class StaffTags(commands.Cog):
         )
 
         # Check if tag has already been added
-        if tag_name in [t["name"] for t in src.discord.globals.TAGS]:
+        if tag_name in src.discord.globals.TAGS:
             return await interaction.edit_original_response(
                 content=f"The `{tag_name}` tag has already been added. To edit this tag, please use `/tagedit` instead.",
             )
@@ -93,8 +94,14 @@ class StaffTags(commands.Cog):
         }
 
         # Add tag to logs
-        src.discord.globals.TAGS.append(new_dict)
+        if tag_name in src.discord.globals.TAGS:
+            return await interaction.edit_original_response(
+                content=f"The `{tag_name}` tag was added while you were writing it. To edit this tag, please use `/tagedit` instead.",
+            )
         await self.bot.mongo_database.insert("data", "tags", new_dict)
+        # The change stream may have added the tag already
+        if tag_name not in src.discord.globals.TAGS:
+            src.discord.globals.TAGS.add(Tag.from_document(new_dict))
         await interaction.edit_original_response(
             content=f"The `{tag_name}` tag was added!",
         )
@@ -124,18 +131,16 @@ class StaffTags(commands.Cog):
             content=f"{EMOJI_LOADING} Attempting to update the `{tag_name}` tag...",
         )
 
-        # Check that tag exists.
-        if tag_name not in [t["name"] for t in src.discord.globals.TAGS]:
+        # Check that tag exists, and get it
+        tag = src.discord.globals.TAGS.get(tag_name)
+        if tag is None:
             return await interaction.edit_original_response(
                 content=f"No tag with name `{tag_name}` could be found.",
             )
 
-        # Get relevant tag
-        tag = next(t for t in src.discord.globals.TAGS if t["name"] == tag_name)
-
         # Send info message about updating tag
         await interaction.edit_original_response(
-            content=f"{EMOJI_LOADING}The current content of the tag is:\n----------\n{tag['output']}\n----------\n"
+            content=f"{EMOJI_LOADING}The current content of the tag is:\n----------\n{tag.output}\n----------\n"
             + "Please send the new text for the tag below:",
         )
 
@@ -158,25 +163,25 @@ class StaffTags(commands.Cog):
 
         # update_dict will contain values that need to be updated in DB
         update_dict = {}
+        permissions = dict(tag.permissions)
 
-        # Changing tag object changes tag locally
         # Always set the new text of tag
-        tag["output"] = text
         update_dict["output"] = text
 
         # Change permissions if desired
         if launch_helpers != "do not change":
-            tag["permissions"]["launch_helpers"] = launch_helpers == "yes"
+            permissions["launch_helpers"] = launch_helpers == "yes"
             update_dict["permissions.launch_helpers"] = launch_helpers == "yes"
         if members != "do not change":
-            tag["permissions"]["members"] = members == "yes"
+            permissions["members"] = members == "yes"
             update_dict["permissions.members"] = members == "yes"
 
-        # Update tag
+        # Update tag locally and in the DB
+        src.discord.globals.TAGS.update(tag_name, output=text, permissions=permissions)
         await self.bot.mongo_database.update(
             "data",
             "tags",
-            tag["_id"],
+            tag._id,
             {"$set": update_dict},
         )
         await interaction.edit_original_response(
@@ -202,18 +207,15 @@ class StaffTags(commands.Cog):
             content=f"{EMOJI_LOADING} Attempting to delete the `{tag_name}` tag...",
         )
 
+        # Get tag and remove it!
+        tag = src.discord.globals.TAGS.remove(tag_name)
         # If tag does not exist
-        if tag_name not in [t["name"] for t in src.discord.globals.TAGS]:
+        if tag is None:
             return await interaction.edit_original_response(
                 content=f"No tag with the name of `{tag_name}` was found.",
             )
-
-        # Get tag
-        tag = next(t for t in src.discord.globals.TAGS if t["name"] == tag_name)
-        # and remove it!
-        src.discord.globals.TAGS.remove(tag)
         # and delete it from the DB!
-        await self.bot.mongo_database.delete("data", "tags", tag["_id"])
+        await self.bot.mongo_database.delete("data", "tags", tag._id)
 
         # Send confirmation message
         return await interaction.edit_original_response(
@@ -63,6 +63,14 @@ class SlowMode(app_commands.Group):
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         return commandchecks.is_staff_from_ctx(interaction, no_raise=True)
 
+    async def disable_auto(self, channel: discord.TextChannel) -> None:
+        """
+        Stops the slowmode of a channel from being adjusted automatically.
+        """
+        auto_slowmode = dict(self.bot.settings.get("auto_slowmode") or {})
+        if auto_slowmode.pop(str(channel.id), None) is not None:
+            await self.bot.update_setting({"auto_slowmode": auto_slowmode})
+
     @app_commands.command(
         name="set",
         description="Sets the slowmode for a particular channel.",
@@ -80,11 +88,48 @@ class SlowMode(app_commands.Group):
         commandchecks.is_staff_from_ctx(interaction)
 
         channel = channel or interaction.channel
+        await self.disable_auto(channel)
         await channel.edit(slowmode_delay=delay)
         await interaction.response.send_message(
             f"Enabled a slowmode delay of {delay} seconds.",
         )
 
+    @app_commands.command(
+        name="auto",
+        description="Adjusts the slowmode of a channel based on how quickly messages are sent.",
+    )
+    @app_commands.describe(
+        minimum="Optional. The smallest slowmode delay to use, in seconds. If none, assumed to be 0 seconds.",
+        maximum="Optional. The largest slowmode delay to use, in seconds. If none, assumed to be 60 seconds.",
+        channel="Optional. The channel to enable automatic slowmode in. If none, assumed in the current channel.",
+    )
+    async def slowmode_auto(
+        self,
+        interaction: discord.Interaction,
+        minimum: app_commands.Range[int, 0, 21600] = 0,
+        maximum: app_commands.Range[int, 0, 21600] = 60,
+        channel: discord.TextChannel = None,
+    ):
+        """
+        Enables automatic slowmode on a particular channel, keeping the delay
+        between the given bounds.
+        """
+        commandchecks.is_staff_from_ctx(interaction)
+
+        if minimum > maximum:
+            return await interaction.response.send_message(
+                "The minimum slowmode delay can not be larger than the maximum delay.",
+                ephemeral=True,
+            )
+
+        channel = channel or interaction.channel
+        auto_slowmode = dict(self.bot.settings.get("auto_slowmode") or {})
+        auto_slowmode[str(channel.id)] = {"min": minimum, "max": maximum}
+        await self.bot.update_setting({"auto_slowmode": auto_slowmode})
+        await interaction.response.send_message(
+            f"Enabled automatic slowmode in {channel.mention}. The delay will be kept between {minimum} and {maximum} seconds.",
+        )
+
     @app_commands.command(
         name="remove",
         description="Removes the slowmode set on a given channel.",
@@ -103,6 +148,7 @@ class SlowMode(app_commands.Group):
         commandchecks.is_staff_from_ctx(interaction)
 
         channel = channel or interaction.channel
+        await self.disable_auto(channel)
         await channel.edit(slowmode_delay=0)
         await interaction.response.send_message(
             f"Removed the slowmode delay in {channel.mention}.",
@@ -893,15 +939,25 @@ class StaffEssential(StaffCommands):
                 "Unfortunately, there are no items in the CRON list to manage.",
             )
 
+        cron_cog: commands.Cog | CronTasks = self.bot.get_cog("CronTasks")
+        stats = cron_cog.cron_stats
+        last_drain = "No tasks have run yet."
+        if cron_cog.last_drain:
+            count, seconds = cron_cog.last_drain
+            last_drain = f"The last {count} due tasks ran in {seconds:.1f} seconds."
+
         cron_embed = discord.Embed(
             title="Managing the CRON list",
             color=discord.Color.blurple(),
-            description="""
+            description=f"""
             Hello! Managing the CRON list gives you the power to change when or how Pi-Bot automatically executes commands.
 
             **Completing a task:** Do you want to instantly unmute a user who is scheduled to be unmuted later? Sure, select the CRON entry from the dropdown, and then select *"Complete Now"*!
 
             **Removing a task:** Want to completely remove a task so Pi-Bot will never execute it? No worries, select the CRON entry from the dropdown and select *"Remove"*!
+
+            **Queue:** {cron_cog.cron_queue.qsize()} due tasks waiting, {len(cron_cog.schedule)} scheduled. {last_drain}
+            **Since restart:** {stats['completed']} completed, {stats['retried']} retried, {stats['timeouts']} timed out, {stats['failed']} moved to failed tasks
             """,
         )
 
@@ -1369,7 +1425,9 @@ class StaffNonessential(StaffCommands, name="StaffNonesntl"):
             await interaction.edit_original_response(
                 content=f"{EMOJI_LOADING} Updating all users' pings.",
             )
-            src.discord.globals.PING_INFO = await self.bot.mongo_database.get_pings()
+            src.discord.globals.PING_INFO.load(
+                await self.bot.mongo_database.get_pings(),
+            )
             await interaction.edit_original_response(
                 content=":white_check_mark: Updated all users' pings.",
             )
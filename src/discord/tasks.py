@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import collections
+import contextlib
 import datetime
+import heapq
+import itertools
 import logging
 import random
+import time
 import traceback
 from typing import TYPE_CHECKING, Any
 
@@ -17,18 +23,61 @@ from src.discord.views import UnselfmuteView
 if TYPE_CHECKING:
     from bot import PiBot
 
+    from .censor import Censor
+    from .ping import PingManager
+    from .raid import RaidManager
     from .reporter import Reporter
+    from .spam import SpamManager
 
 
 logger = logging.getLogger(__name__)
 
 
 class CronTasks(commands.Cog):
+    # The time each CRON task is due, in a min-heap ordered by time and then by
+    # when the task was scheduled
+    schedule: list[tuple[datetime.datetime, int, dict[str, Any]]]
+    scheduled_ids: set[Any]
+    cron_queue: asyncio.Queue[dict[str, Any]]
+    cron_stats: collections.Counter[str]
+    last_drain: tuple[int, float] | None  # The tasks run and seconds taken
+
+    # Limits
+    cron_workers = 4  # The number of CRON tasks run at once
+    cron_timeout = 60  # The number of seconds a CRON task can run before failing
+    # The number of seconds before a failed CRON task is first retried, which
+    # doubles with each attempt
+    cron_retry_delay = 60
+    cron_max_attempts = 5  # The number of attempts before a task is given up on
+    # How far ahead the schedule is loaded from the database, which must be longer
+    # than the time between reloads
+    schedule_horizon = datetime.timedelta(hours=2)
+
     def __init__(self, bot: PiBot):
         self.bot = bot
+        self.schedule = []
+        self.scheduled_ids = set()
+        self._schedule_order = itertools.count()
+        self._schedule_changed = asyncio.Event()
+        self._scheduler: asyncio.Task | None = None
+        self.cron_queue = asyncio.Queue()
+        self.cron_stats = collections.Counter()
+        self.last_drain = None
+        self._workers: list[asyncio.Task] = []
+        # The number of tasks queued or running, and when and how many tasks were
+        # first queued since the queue was last empty
+        self._cron_pending = 0
+        self._drain_started = 0.0
+        self._drain_count = 0
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
+        try:
+            await self.bot.mongo_database.create_cron_indexes()
+        except Exception:
+            logger.error("Error in starting function with creating CRON indexes:")
+            traceback.print_exc()
+
         try:
             await self.pull_prev_info()
         except Exception:
@@ -43,10 +92,21 @@ class CronTasks(commands.Cog):
             logger.error("Error in starting function with updating tournament list:")
             traceback.print_exc()
 
-        self.cron.start()
+        self.reload_schedule.start()
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.create_task(self.run_schedule())
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._cron_worker())
+                for _ in range(self.cron_workers)
+            ]
         self.change_bot_status.start()
         self.send_unselfmute.start()
         self.update_member_count.start()
+        self.audit_usernames.start()
+        self.adjust_slowmode.start()
+        self.refresh_raid.start()
+        self.send_ping_digests.start()
 
     @tasks.loop(minutes=10)
     async def send_unselfmute(self):
@@ -69,19 +129,36 @@ class CronTasks(commands.Cog):
             await unselfmute_channel.send(embed=embed, view=UnselfmuteView(self.bot))
 
     def cog_unload(self):
-        self.cron.cancel()
+        self.reload_schedule.cancel()
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+        for worker in self._workers:
+            worker.cancel()
         self.change_bot_status.cancel()
         self.update_member_count.cancel()
+        self.audit_usernames.cancel()
+        self.adjust_slowmode.cancel()
+        self.refresh_raid.cancel()
+        self.send_ping_digests.cancel()
 
     async def pull_prev_info(self):
-        src.discord.globals.REPORTS = await self.bot.mongo_database.get_reports()
-        src.discord.globals.PING_INFO = await self.bot.mongo_database.get_pings()
-        src.discord.globals.TAGS = await self.bot.mongo_database.get_tags()
-        src.discord.globals.EVENT_INFO = await self.bot.mongo_database.get_events()
+        # Load the cached collections, and keep them current as they change
+        await asyncio.gather(
+            *self.bot.mongo_database.start_sync(
+                {
+                    "reports": src.discord.globals.REPORTS,
+                    "pings": src.discord.globals.PING_INFO,
+                    "tags": src.discord.globals.TAGS,
+                    "events": src.discord.globals.EVENT_INFO,
+                    "censor": src.discord.globals.CENSOR,
+                },
+            ),
+        )
         self.bot.settings = await self.bot.mongo_database.get_settings()
         assert isinstance(self.bot.settings, dict)
 
-        src.discord.globals.CENSOR = await self.bot.mongo_database.get_censor()
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        censor_cog.load_image_hashes(await self.bot.mongo_database.get_image_hashes())
         logger.info("Fetched previous variables.")
 
     async def add_to_cron(self, item_dict: dict) -> None:
@@ -89,6 +166,78 @@ class CronTasks(commands.Cog):
         Adds the given document to the CRON list.
         """
         await self.bot.mongo_database.insert("data", "cron", item_dict)
+        self.schedule_task(item_dict)
+
+    def schedule_task(
+        self,
+        task: dict[str, Any],
+        time: datetime.datetime | None = None,
+    ) -> None:
+        """
+        Adds a CRON task to the in-memory schedule.
+
+        Args:
+            task: The CRON task's document.
+            time: When to run the task. Defaults to the task's own time.
+        """
+        heapq.heappush(
+            self.schedule,
+            (time or task["time"], next(self._schedule_order), task),
+        )
+        self.scheduled_ids.add(task["_id"])
+        if self.schedule[0][2] is task:
+            # The scheduler is sleeping until a later task
+            self._schedule_changed.set()
+
+    async def run_schedule(self) -> None:
+        """
+        Queues CRON tasks to be run as they become due, sleeping until the earliest
+        task is due or the schedule changes.
+        """
+        while True:
+            self._schedule_changed.clear()
+            delay = None
+            if self.schedule:
+                delay = (self.schedule[0][0] - discord.utils.utcnow()).total_seconds()
+            if delay is None or delay > 0:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._schedule_changed.wait(), delay)
+                continue
+
+            # The task stays in the scheduled IDs until it has run, so that it is
+            # not scheduled again while it is queued
+            _, _, task = heapq.heappop(self.schedule)
+            if not self._cron_pending:
+                self._drain_started = time.monotonic()
+                self._drain_count = 0
+            self._cron_pending += 1
+            self._drain_count += 1
+            self.cron_queue.put_nowait(task)
+
+    async def _cron_worker(self) -> None:
+        """
+        Runs queued CRON tasks, one at a time.
+        """
+        while True:
+            task = await self.cron_queue.get()
+            try:
+                await self.run_cron_task(task)
+            except Exception:
+                logger.exception(f"Could not run CRON task {task['_id']}:")
+                self.scheduled_ids.discard(task["_id"])
+            finally:
+                self.cron_queue.task_done()
+                self._cron_pending -= 1
+                if not self._cron_pending:
+                    self.last_drain = (
+                        self._drain_count,
+                        time.monotonic() - self._drain_started,
+                    )
+                    if self._drain_count > 1:
+                        logger.info(
+                            f"Ran {self._drain_count} CRON tasks in "
+                            f"{self.last_drain[1]:.1f} seconds.",
+                        )
 
     async def delete_from_cron(self, doc_id: str) -> None:
         """
@@ -197,35 +346,158 @@ class CronTasks(commands.Cog):
         await vc.edit(name=f"{member_count} Members (+{joined_today}/-{left_today})")
         logger.debug("Refreshed member count.")
 
+    @tasks.loop(hours=24)
+    async def audit_usernames(self):
+        """
+        Autonomous task which checks all members' names against the censor, so that
+        names which became inappropriate after a censor list change are reported.
+        """
+        guild = self.bot.get_guild(env.server_id)
+        assert isinstance(guild, discord.Guild)
+
+        censor_cog: commands.Cog | Censor = self.bot.get_cog("Censor")
+        await censor_cog.audit_usernames(guild)
+
+    @tasks.loop(seconds=30)
+    async def adjust_slowmode(self):
+        """
+        Autonomous task which raises or lowers the slowmode of channels with
+        automatic slowmode enabled, based on how quickly messages are being sent.
+        """
+        spam_cog: commands.Cog | SpamManager = self.bot.get_cog("SpamManager")
+        await spam_cog.adjust_slowmode()
+
     @tasks.loop(minutes=1)
-    async def cron(self) -> None:
-        """
-        The main CRON handler, running every minute. On every execution of the function, all CRON tasks are fetched and are evaluated to check if they are old and action needs to be taken.
-        """
-        logger.debug("Executing CRON...")
-        # Get the relevant tasks
-        cron_list = await self.bot.mongo_database.get_cron()
-
-        for task in cron_list:
-            # If the date has passed, execute task
-            if discord.utils.utcnow() > task["time"]:
-                try:
-                    if task["type"] == "UNBAN":
-                        await self.cron_handle_unban(task)
-                    elif task["type"] == "UNMUTE":
-                        await self.cron_handle_unmute(task)
-                    elif task["type"] == "UNSELFMUTE":
-                        await self.cron_handle_unselfmute(task)
-                    elif task["type"] == "REMOVE_STATUS":
-                        await self.cron_handle_remove_status(task)
-                    else:
-                        logger.error("ERROR:")
-                        reporter_cog = self.bot.get_cog("Reporter")
-                        await reporter_cog.create_cron_task_report(task)
-                except Exception:
-                    traceback.print_exc()
-                    reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
-                    await reporter_cog.create_cron_task_report(task)
+    async def refresh_raid(self):
+        """
+        Autonomous task which keeps the report of an ongoing raid up to date, and
+        ends the raid once members stop joining.
+        """
+        raid_cog: commands.Cog | RaidManager = self.bot.get_cog("RaidManager")
+        await raid_cog.refresh_raid()
+
+    @tasks.loop(minutes=30)
+    async def send_ping_digests(self):
+        """
+        Autonomous task which sends the collected ping alerts of users in digest
+        mode.
+        """
+        ping_cog: commands.Cog | PingManager = self.bot.get_cog("ping")
+        await ping_cog.send_digests()
+
+    @tasks.loop(hours=1)
+    async def reload_schedule(self) -> None:
+        """
+        Autonomous task which adds the CRON tasks due within the schedule horizon
+        to the in-memory schedule. The database remains the durable record of every
+        CRON task, so tasks added to it outside of the bot are picked up here.
+        """
+        logger.debug("Reloading CRON schedule...")
+        due = await self.bot.mongo_database.get_due_cron(
+            discord.utils.utcnow() + self.schedule_horizon,
+        )
+        for task in due:
+            if task["_id"] not in self.scheduled_ids:
+                self.schedule_task(task)
+
+    async def run_cron_task(self, task: dict[str, Any]) -> None:
+        """
+        Runs a due CRON task, within the CRON task time limit. Failed tasks are
+        retried with exponential backoff, and after too many attempts are moved to
+        the failed CRON tasks and reported to staff.
+        """
+        try:
+            # The task may have been completed, removed or retried since it was
+            # scheduled
+            current = await self.bot.mongo_database.get_cron_task(task["_id"])
+        except Exception:
+            logger.exception("Could not fetch a due CRON task:")
+            self.schedule_task(
+                task,
+                discord.utils.utcnow()
+                + datetime.timedelta(seconds=self.cron_retry_delay),
+            )
+            return
+        if current is None:
+            self.scheduled_ids.discard(task["_id"])
+            return
+        if current["time"] > discord.utils.utcnow():
+            self.schedule_task(current)
+            return
+
+        try:
+            await asyncio.wait_for(self.handle_cron_task(current), self.cron_timeout)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.cron_stats["timeouts"] += 1
+            await self.retry_cron_task(current, e)
+        else:
+            self.cron_stats["completed"] += 1
+            self.scheduled_ids.discard(current["_id"])
+
+    async def handle_cron_task(self, task: dict[str, Any]) -> None:
+        """
+        Serves a CRON task with the handler for its type. A handler which fails or
+        times out is run again, so handlers only repeat actions which are safe to
+        repeat, and remove their task before sending any notices.
+
+        Raises:
+            ValueError: The task's type has no handler.
+        """
+        if task["type"] == "UNBAN":
+            await self.cron_handle_unban(task)
+        elif task["type"] == "UNMUTE":
+            await self.cron_handle_unmute(task)
+        elif task["type"] == "UNSELFMUTE":
+            await self.cron_handle_unselfmute(task)
+        elif task["type"] == "REMOVE_STATUS":
+            await self.cron_handle_remove_status(task)
+        else:
+            raise ValueError(f"Unknown CRON task type: {task['type']!r}")
+
+    async def retry_cron_task(self, task: dict[str, Any], error: Exception) -> None:
+        """
+        Schedules a failed CRON task to be retried, or moves it to the failed CRON
+        tasks and reports it to staff once it has failed too many times.
+
+        Args:
+            task: The CRON task's document.
+            error: The error the task failed with.
+        """
+        attempts = task.get("attempts", 0) + 1
+        logger.warning(
+            f"CRON task {task['_id']} failed on attempt {attempts}: {error!r}",
+        )
+
+        if attempts >= self.cron_max_attempts:
+            self.cron_stats["failed"] += 1
+            self.scheduled_ids.discard(task["_id"])
+            failed = {
+                **task,
+                "attempts": attempts,
+                "error": repr(error),
+                "failed_at": discord.utils.utcnow(),
+            }
+            # Keyed by the task's ID, so a task failing again after its removal
+            # from CRON itself failed does not store a second copy
+            await self.bot.mongo_database.replace("data", "cron_failed", failed)
+            await self.delete_from_cron(task["_id"])
+            reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+            await reporter_cog.create_cron_task_report(failed)
+            return
+
+        self.cron_stats["retried"] += 1
+        retry_time = discord.utils.utcnow() + datetime.timedelta(
+            seconds=self.cron_retry_delay * 2 ** (attempts - 1),
+        )
+        # The retry is stored so that it survives restarts
+        await self.bot.mongo_database.update(
+            "data",
+            "cron",
+            task["_id"],
+            {"$set": {"time": retry_time, "attempts": attempts}},
+        )
+        self.schedule_task({**task, "time": retry_time, "attempts": attempts})
 
     async def cron_handle_unban(self, task: dict):
         """
@@ -240,26 +512,30 @@ class CronTasks(commands.Cog):
 
         # Attempt to unban user
         member = await self.bot.fetch_user(task["user"])
-        if member in server.members:
-            # User is still in server, thus already unbanned
-            await reporter_cog.create_cron_unban_auto_notice(member, is_present=True)
-        else:
+        is_present = member in server.members
+        already_unbanned = False
+        if not is_present:
             # User is not in server, thus unban the
-            already_unbanned = False
             try:
                 await server.unban(member)
             except Exception:
                 # The unbanning failed (likely the user was already unbanned)
                 already_unbanned = True
+
+        # Remove cron task before notifying staff, so that a retry of the task
+        # cannot send the notice twice
+        await self.delete_from_cron(task["_id"])
+
+        if is_present:
+            # User is still in server, thus already unbanned
+            await reporter_cog.create_cron_unban_auto_notice(member, is_present=True)
+        else:
             await reporter_cog.create_cron_unban_auto_notice(
                 member,
                 is_present=False,
                 already_unbanned=already_unbanned,
             )
 
-        # Remove cron task.
-        await self.delete_from_cron(task["_id"])
-
     async def cron_handle_unmute(self, task: dict):
         """
         Handles serving CRON tasks with the type of 'UNMUTE'.
@@ -278,17 +554,18 @@ class CronTasks(commands.Cog):
 
         # Attempt to unmute user
         member = server.get_member(task["user"])
-        if member in server.members:
+        is_present = member in server.members
+        if is_present:
             # User is still in server, thus can be unmuted
             await member.remove_roles(muted_role)
-            await reporter_cog.create_cron_unmute_auto_notice(member, is_present=True)
-        else:
-            # User is not in server, thus no unmute can occur
-            await reporter_cog.create_cron_unmute_auto_notice(member, is_present=False)
 
-        # Remove cron task.
+        # Remove cron task before notifying staff, so that a retry of the task
+        # cannot send the notice twice
         await self.delete_from_cron(task["_id"])
 
+        # If the user is not in the server, no unmute could occur
+        await reporter_cog.create_cron_unmute_auto_notice(member, is_present=is_present)
+
     async def cron_handle_unselfmute(self, task: dict):
         """
         Handles serving CRON tasks with the type of 'UNSELFMUTE'.
@@ -44,15 +44,12 @@ class UnselfmuteView(discord.ui.View):
         await interaction.response.defer(ephemeral=True)
         role = discord.utils.get(interaction.guild.roles, name=ROLE_SELFMUTE)
         await interaction.user.remove_roles(role)
-        try:
-            item = next(
-                x
-                for x in await self.bot.mongo_database.get_cron()
-                if (x["type"] == "UNSELFMUTE" and x["user"] == interaction.user.id)
-            )
+        item = await self.bot.mongo_database.get_user_cron(
+            "UNSELFMUTE",
+            interaction.user.id,
+        )
+        if item is not None:  # not in the database - maybe was removed!
             await self.bot.mongo_database.remove_doc("data", "cron", item["_id"])
-        except Exception:  # not in the database - maybe was removed!
-            pass
 
         return await interaction.followup.send(
             "I removed your selfmute role!",
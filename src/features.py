@@ -0,0 +1,185 @@
+"""
+Builds a normalized view of message content which is shared by the censor, spam
+and ping systems.
+
+Each message is normalized and scanned once, so that tricks used to evade the
+censor or pings (such as zero-width characters, markdown inside words, or letters
+from other alphabets that look like Latin letters) are handled the same way by
+every system.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import cached_property
+
+from src.links import Link, extract_links
+from src.minhash import Signature, minhash
+
+# Characters which are invisible, and are commonly inserted inside words
+ZERO_WIDTH_CHARACTERS = "\u00ad\u180e\u200b\u200c\u200d\u2060\ufeff"
+
+# Markdown characters which are commonly inserted inside words
+MARKDOWN_CHARACTERS = "*~|`"
+
+# Letters from other alphabets which look like Latin letters
+CONFUSABLES = {
+    "\u0430": "a",  # cyrillic small letter a
+    "\u0432": "b",  # cyrillic small letter ve
+    "\u0441": "c",  # cyrillic small letter es
+    "\u0435": "e",  # cyrillic small letter ie
+    "\u043d": "h",  # cyrillic small letter en
+    "\u0456": "i",  # cyrillic small letter byelorussian-ukrainian i
+    "\u0458": "j",  # cyrillic small letter je
+    "\u043a": "k",  # cyrillic small letter ka
+    "\u043c": "m",  # cyrillic small letter em
+    "\u043e": "o",  # cyrillic small letter o
+    "\u0440": "p",  # cyrillic small letter er
+    "\u0455": "s",  # cyrillic small letter dze
+    "\u0442": "t",  # cyrillic small letter te
+    "\u0445": "x",  # cyrillic small letter ha
+    "\u0443": "y",  # cyrillic small letter u
+    "\u0410": "A",  # cyrillic capital letter a
+    "\u0412": "B",  # cyrillic capital letter ve
+    "\u0421": "C",  # cyrillic capital letter es
+    "\u0415": "E",  # cyrillic capital letter ie
+    "\u041d": "H",  # cyrillic capital letter en
+    "\u0406": "I",  # cyrillic capital letter byelorussian-ukrainian i
+    "\u0408": "J",  # cyrillic capital letter je
+    "\u041a": "K",  # cyrillic capital letter ka
+    "\u041c": "M",  # cyrillic capital letter em
+    "\u041e": "O",  # cyrillic capital letter o
+    "\u0420": "P",  # cyrillic capital letter er
+    "\u0405": "S",  # cyrillic capital letter dze
+    "\u0422": "T",  # cyrillic capital letter te
+    "\u0425": "X",  # cyrillic capital letter ha
+    "\u0423": "Y",  # cyrillic capital letter u
+    "\u03b1": "a",  # greek small letter alpha
+    "\u03b5": "e",  # greek small letter epsilon
+    "\u03b9": "i",  # greek small letter iota
+    "\u03ba": "k",  # greek small letter kappa
+    "\u03bd": "v",  # greek small letter nu
+    "\u03bf": "o",  # greek small letter omicron
+    "\u03c1": "p",  # greek small letter rho
+    "\u03c4": "t",  # greek small letter tau
+    "\u03c5": "u",  # greek small letter upsilon
+    "\u03c7": "x",  # greek small letter chi
+    "\u0391": "A",  # greek capital letter alpha
+    "\u0392": "B",  # greek capital letter beta
+    "\u0395": "E",  # greek capital letter epsilon
+    "\u0396": "Z",  # greek capital letter zeta
+    "\u0397": "H",  # greek capital letter eta
+    "\u0399": "I",  # greek capital letter iota
+    "\u039a": "K",  # greek capital letter kappa
+    "\u039c": "M",  # greek capital letter mu
+    "\u039d": "N",  # greek capital letter nu
+    "\u039f": "O",  # greek capital letter omicron
+    "\u03a1": "P",  # greek capital letter rho
+    "\u03a4": "T",  # greek capital letter tau
+    "\u03a5": "Y",  # greek capital letter upsilon
+    "\u03a7": "X",  # greek capital letter chi
+}
+
+NORMALIZATION_TABLE = str.maketrans(
+    {
+        **CONFUSABLES,
+        **dict.fromkeys(ZERO_WIDTH_CHARACTERS + MARKDOWN_CHARACTERS),
+    },
+)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize(content: str) -> str:
+    """
+    Normalizes text for matching: applies NFKC normalization (which folds
+    fullwidth and stylized letters into plain letters), maps lookalike letters
+    from other alphabets to Latin letters, and removes zero-width and markdown
+    characters. Case is preserved.
+    """
+    return unicodedata.normalize("NFKC", content).translate(NORMALIZATION_TABLE)
+
+
+def normalized_spans(content: str) -> list[tuple[int, int]] | None:
+    """
+    Maps each character of the normalized content back to the span of the
+    original content it came from, so that matches found in the normalized
+    content can be applied to the original.
+
+    Each character is normalized together with the combining marks following it,
+    which gives the same result as normalizing the whole content in nearly every
+    case. If it does not, None is returned.
+    """
+    spans = []
+    pieces = []
+    start = 0
+    while start < len(content):
+        end = start + 1
+        while end < len(content) and unicodedata.combining(content[end]):
+            end += 1
+        piece = normalize(content[start:end])
+        pieces.append(piece)
+        spans.extend([(start, end)] * len(piece))
+        start = end
+    if "".join(pieces) != normalize(content):
+        return None
+    return spans
+
+
+@dataclass(frozen=True)
+class MessageFeatures:
+    """
+    Features of a message's content, computed once per message.
+    """
+
+    content: str  # The original content
+    text: str  # The normalized content, see normalize()
+    folded: str  # The normalized content, case folded
+    tokens: list[str]  # The words in the folded content
+    upper_count: int  # The number of uppercase letters in the original content
+    lower_count: int  # The number of lowercase letters in the original content
+    links: list[Link]  # The links in the original content
+    digest: bytes  # A hash of the folded content
+
+    @classmethod
+    def build(cls, content: str) -> MessageFeatures:
+        """
+        Computes the features of some content.
+        """
+        text = normalize(content)
+        folded = text.casefold()
+        return cls(
+            content=content,
+            text=text,
+            folded=folded,
+            tokens=TOKEN_PATTERN.findall(folded),
+            upper_count=sum(1 for c in content if c.isupper()),
+            lower_count=sum(1 for c in content if c.islower()),
+            links=extract_links(content),
+            digest=hashlib.blake2b(folded.encode(), digest_size=16).digest(),
+        )
+
+    @property
+    def has_caps(self) -> bool:
+        """
+        Whether the content has caps (more capitalized letters than lowercase
+        letters).
+        """
+        return self.upper_count > (self.lower_count + 3)
+
+    @cached_property
+    def signature(self) -> Signature:
+        """
+        The MinHash signature of the folded content, computed on first use.
+        """
+        return minhash(self.folded)
+
+    @cached_property
+    def spans(self) -> list[tuple[int, int]] | None:
+        """
+        The span of the original content each character of the normalized content
+        came from, see normalized_spans(). Computed on first use.
+        """
+        return normalized_spans(self.content)
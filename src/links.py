@@ -0,0 +1,79 @@
+"""
+Extracts links from message content in a single linear pass, and checks them
+against sets of allowed invite codes and blocked domains.
+
+Content is split into tokens on whitespace and markdown punctuation, and only
+tokens containing a dot are parsed further. Every check against an allowlist or
+blocklist is a set lookup, so the cost of checking a message does not depend on
+the size of the lists.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+TOKEN_SEPARATORS = re.compile(r"[\s<>()\[\]{}\"'`|*~]+")
+HOST_PATTERN = re.compile(r"[a-z0-9-]+(?:\.[a-z0-9-]+)+")
+TRAILING_PUNCTUATION = ".,!?;:"
+
+# Hosts serving Discord invites, and the path prefix the invite code follows
+INVITE_HOSTS = {
+    "discord.gg": "/",
+    "discord.com": "/invite/",
+    "discordapp.com": "/invite/",
+}
+
+
+class Link(NamedTuple):
+    host: str
+    path: str
+
+
+def normalize_domain(domain: str) -> str:
+    """
+    Normalizes a domain entered by a user, removing any scheme, leading "www."
+    and path.
+    """
+    domain = domain.strip().lower()
+    domain = domain.split("://", 1)[-1]
+    domain = domain.split("/", 1)[0]
+    return domain.removeprefix("www.").rstrip(TRAILING_PUNCTUATION)
+
+
+def extract_links(content: str) -> list[Link]:
+    """
+    Extracts every link from the content, whether or not it has a scheme.
+    """
+    links = []
+    for token in TOKEN_SEPARATORS.split(content):
+        if "." not in token:
+            continue
+        token = token.rstrip(TRAILING_PUNCTUATION)
+        location = token.split("://", 1)[-1]
+        host, slash, path = location.partition("/")
+        host = host.split("?", 1)[0].split("#", 1)[0]
+        host = host.rsplit("@", 1)[-1].split(":", 1)[0].lower().removeprefix("www.")
+        if HOST_PATTERN.fullmatch(host):
+            links.append(Link(host, slash + path))
+    return links
+
+
+def invite_code(link: Link) -> str | None:
+    """
+    Returns the invite code of a Discord invite link, or None if the link is not
+    a Discord invite.
+    """
+    prefix = INVITE_HOSTS.get(link.host)
+    if prefix is None or not link.path.startswith(prefix):
+        return None
+    code = link.path[len(prefix) :].split("/", 1)[0].split("?", 1)[0]
+    return code.split("#", 1)[0] or None
+
+
+def domain_blocked(host: str, blocked_domains: set[str]) -> bool:
+    """
+    Returns whether the host, or any domain it is a subdomain of, is blocked.
+    """
+    labels = host.split(".")
+    return any(".".join(labels[i:]) in blocked_domains for i in range(len(labels) - 1))
@@ -0,0 +1,163 @@
+"""
+Computes MinHash signatures of text and indexes them for finding near-duplicate
+messages.
+
+The MinHash signature of some text is the minimum of several hash functions over
+its character shingles. Each shingle is hashed once, and the hash functions are
+cheap universal hashes of that value, so signatures are fast enough to compute on
+the event loop. The fraction of positions where two signatures agree
+estimates the Jaccard similarity of the texts' shingle sets, so a message with a
+character or emoji added still has a signature nearly equal to the original.
+
+Signatures are indexed with locality-sensitive hashing: each signature is split
+into bands, and messages sharing any band exactly become candidates. Similar
+texts are very likely to share at least one band, while dissimilar texts almost
+never do, so candidates are found with a few dictionary lookups rather than by
+comparing against every recent signature.
+"""
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import random
+
+SHINGLE_SIZE = 4
+SIGNATURE_SIZE = 32  # The number of hash functions in a signature
+MAX_LENGTH = 500  # The number of characters of text which are shingled
+
+# The hash functions are (a * x + b) mod p over the hash x of each shingle, with
+# fixed coefficients so that signatures are the same across restarts
+_PRIME = (1 << 31) - 1
+_COEFFICIENTS = [
+    (rng.randrange(1, _PRIME), rng.randrange(_PRIME))
+    for rng in [random.Random(0)]
+    for _ in range(SIGNATURE_SIZE)
+]
+
+Signature = tuple[int, ...]
+
+
+def shingles(text: str) -> set[str]:
+    """
+    Returns the set of character shingles of some text, after collapsing
+    whitespace. Only the start of long text is shingled.
+    """
+    text = " ".join(text.split())[:MAX_LENGTH]
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> Signature:
+    """
+    Computes the MinHash signature of the character shingles of some text.
+    """
+    hashes = [
+        int.from_bytes(
+            hashlib.blake2b(shingle.encode(), digest_size=4).digest(),
+            "big",
+        )
+        % _PRIME
+        for shingle in shingles(text)
+    ]
+    return tuple(min([(a * x + b) % _PRIME for x in hashes]) for a, b in _COEFFICIENTS)
+
+
+def similarity(first: Signature, second: Signature) -> float:
+    """
+    Estimates the Jaccard similarity of the texts two signatures were computed from.
+    """
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+class MinHashIndex:
+    """
+    A sliding window of recent signatures, indexed by band for finding similar
+    signatures.
+
+    Signatures are expired in the order they were added, once they are older than
+    the window or the index holds more than its limit.
+    """
+
+    rows: int
+    window: float
+    limit: int
+
+    def __init__(self, rows: int = 4, window: float = 300, limit: int = 10000):
+        self.rows = rows
+        self.window = window
+        self.limit = limit
+        self._entries: collections.deque[
+            tuple[float, int, Signature]
+        ] = collections.deque()
+        self._buckets: dict[
+            tuple[int, Signature],
+            collections.deque[tuple[float, int, Signature]],
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, signature: Signature) -> list[tuple[int, Signature]]:
+        return [
+            (start, signature[start : start + self.rows])
+            for start in range(0, len(signature), self.rows)
+        ]
+
+    def _pop(self) -> None:
+        entry = self._entries.popleft()
+        for key in self._keys(entry[2]):
+            # Each bucket is in the same order as the entries, so the oldest entry
+            # is always at the front of its buckets
+            bucket = self._buckets[key]
+            bucket.popleft()
+            if not bucket:
+                del self._buckets[key]
+
+    def expire(self, now: float) -> None:
+        """
+        Removes all signatures which are older than the window.
+        """
+        cutoff = now - self.window
+        while self._entries and self._entries[0][0] < cutoff:
+            self._pop()
+
+    def add(self, timestamp: float, owner: int, signature: Signature) -> None:
+        """
+        Adds a signature to the index.
+
+        Args:
+            timestamp: The time the signature was seen, which must not be earlier
+                than any signature already in the index.
+            owner: The ID of the owner of the signature, such as a message author.
+            signature: The signature to add.
+        """
+        entry = (timestamp, owner, signature)
+        self._entries.append(entry)
+        for key in self._keys(signature):
+            self._buckets.setdefault(key, collections.deque()).append(entry)
+        if len(self._entries) > self.limit:
+            self._pop()
+
+    def search(self, signature: Signature, threshold: float) -> list[int]:
+        """
+        Returns the owner of every signature in the index which is estimated to be
+        at least as similar to a signature as the threshold. An owner is returned
+        once for every matching signature.
+
+        Args:
+            signature: The signature to search for.
+            threshold: The smallest estimated Jaccard similarity to consider a
+                match.
+        """
+        owners = []
+        seen = set()
+        for key in self._keys(signature):
+            for entry in self._buckets.get(key, ()):
+                if id(entry) in seen:
+                    continue
+                seen.add(id(entry))
+                if similarity(signature, entry[2]) >= threshold:
+                    owners.append(entry[1])
+        return owners
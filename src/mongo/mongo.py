@@ -6,12 +6,69 @@ status or a list of relevant events.
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import datetime
+import logging
 from typing import Any
 
 import motor.motor_asyncio  # MongoDB AsyncIO driver
+import pymongo.errors
 from bson.objectid import ObjectId
+from pymongo import ASCENDING, UpdateOne
 
 from env import env
+from src.store import CensorList, Collection
+
+logger = logging.getLogger(__name__)
+
+# The error code MongoDB returns when change streams are opened on a server which
+# is not part of a replica set
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+def _paths_overlap(first: str, second: str) -> bool:
+    return (
+        first == second
+        or first.startswith(f"{second}.")
+        or second.startswith(f"{first}.")
+    )
+
+
+def merge_updates(
+    first: dict[str, Any],
+    second: dict[str, Any],
+) -> dict[str, Any] | None:
+    """
+    Merges two updates to the same document into one update with the same effect
+    as applying them in order.
+
+    Updates setting the same field keep the later value, and increments of the same
+    field are added together. Any other updates touching the same field, such as
+    pushing to an array which was just set, cannot be merged.
+
+    Returns:
+        The merged update, or None if the updates cannot be merged.
+    """
+    merged = {operator: dict(fields) for operator, fields in first.items()}
+    for operator, fields in second.items():
+        for field, value in fields.items():
+            for other_operator, other_fields in merged.items():
+                for other_field in other_fields:
+                    if not _paths_overlap(field, other_field):
+                        continue
+                    if (
+                        operator == other_operator
+                        and field == other_field
+                        and operator in ("$set", "$inc")
+                    ):
+                        continue
+                    return None
+            if operator == "$inc" and field in merged.get("$inc", {}):
+                merged["$inc"][field] += value
+            else:
+                merged.setdefault(operator, {})[field] = value
+    return merged
 
 
 class MongoDatabase:
@@ -20,6 +77,15 @@ class MongoDatabase:
     """
 
     client: motor.motor_asyncio.AsyncIOMotorClient
+    syncs: dict[str, asyncio.Task]
+    synced: dict[str, asyncio.Future[None]]  # Resolved once each cache is loaded
+
+    sync_retry_delay = 5  # The number of seconds to wait before reopening a stream
+
+    # Queued updates
+    write_interval = 1  # The most seconds a queued update waits to be written
+    write_batch_size = 500  # The number of queued updates which are written at once
+    write_retry_limit = 60  # The most seconds failed updates wait to be retried
 
     def __init__(self, bot):
         self.client = motor.motor_asyncio.AsyncIOMotorClient(
@@ -27,6 +93,164 @@ class MongoDatabase:
             tz_aware=True,
         )
         self.bot = bot
+        self.syncs = {}
+        self.synced = {}
+        # The queued updates of each collection, in order, and the position of the
+        # latest queued update of each document
+        self._pending: dict[tuple[str, str], list[tuple[Any, dict[str, Any]]]] = {}
+        self._latest: dict[tuple[str, str, Any], int] = {}
+        self._pending_count = 0
+        self._write_failures = 0  # The number of flushes in a row which failed
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self._write_lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        """
+        Stops syncing caches, and writes any queued updates.
+        """
+        self.stop_sync()
+        # Errors are already logged by flush
+        with contextlib.suppress(pymongo.errors.PyMongoError):
+            await self.flush()
+
+    def start_sync(
+        self,
+        caches: dict[str, Collection | CensorList],
+    ) -> list[asyncio.Future[None]]:
+        """
+        Starts keeping in-memory caches of collections in the data database
+        current. Collections which are already being synced are skipped.
+
+        Args:
+            caches: The cache of each collection, by collection name.
+
+        Returns:
+            A future for each collection, which resolves once its cache has first
+            been loaded, or raises the error the first load failed with. Syncing
+            continues after a failed load.
+        """
+        for collection_name, cache in caches.items():
+            # A failed first load is tried again by the sync, and waited on anew
+            loaded = self.synced.get(collection_name)
+            if loaded is None or (loaded.done() and loaded.exception() is not None):
+                self.synced[
+                    collection_name
+                ] = asyncio.get_running_loop().create_future()
+            task = self.syncs.get(collection_name)
+            if task is None or task.done():
+                self.syncs[collection_name] = asyncio.create_task(
+                    self.sync(collection_name, cache),
+                )
+        return [self.synced[collection_name] for collection_name in caches]
+
+    def _resolve_synced(
+        self,
+        collection_name: str,
+        error: Exception | None = None,
+    ) -> None:
+        """
+        Resolves the future of a collection's first load with the result of a
+        load. A successful load after a failed one replaces the failed future.
+        """
+        loaded = self.synced.get(collection_name)
+        if loaded is not None and not loaded.done():
+            if error is None:
+                loaded.set_result(None)
+            else:
+                loaded.set_exception(error)
+        elif error is None:
+            loaded = asyncio.get_running_loop().create_future()
+            loaded.set_result(None)
+            self.synced[collection_name] = loaded
+
+    def stop_sync(self) -> None:
+        """
+        Stops keeping every in-memory cache current.
+        """
+        for task in self.syncs.values():
+            task.cancel()
+        self.syncs.clear()
+        self.synced.clear()
+
+    async def sync(
+        self,
+        collection_name: str,
+        cache: Collection | CensorList,
+    ) -> None:
+        """
+        Loads a collection of the data database into its cache, and then applies
+        every insert, update and delete to the cache as it happens, using a change
+        stream. Runs until cancelled, resuming the stream if it is lost.
+
+        Change streams are only available on replica sets. On a standalone server,
+        the collection is loaded once, and changes made outside of the bot are only
+        seen after a refresh.
+
+        Args:
+            collection_name: The name of the collection in the data database.
+            cache: The in-memory cache of the collection.
+        """
+        collection = self.client["data"][collection_name]
+        return_one = isinstance(cache, CensorList)
+        resume_token = None
+        while True:
+            try:
+                async with collection.watch(
+                    full_document="updateLookup",
+                    resume_after=resume_token,
+                ) as stream:
+                    if resume_token is None:
+                        # The stream is opened before the collection is loaded, so
+                        # no change made in between is missed
+                        cache.load(
+                            await self.get_entire_collection(
+                                "data",
+                                collection_name,
+                                return_one,
+                            ),
+                        )
+                        self._resolve_synced(collection_name)
+                    async for change in stream:
+                        cache.apply_change(change)
+                        resume_token = stream.resume_token
+                        if change["operationType"] == "invalidate":
+                            # The collection was dropped or renamed
+                            resume_token = None
+            except pymongo.errors.OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning(
+                        f"Change streams are not supported by the database, so the "
+                        f"{collection_name} collection is only loaded once.",
+                    )
+                    try:
+                        cache.load(
+                            await self.get_entire_collection(
+                                "data",
+                                collection_name,
+                                return_one,
+                            ),
+                        )
+                    except pymongo.errors.PyMongoError as load_error:
+                        logger.warning(
+                            f"Could not load the {collection_name} collection: "
+                            f"{load_error}",
+                        )
+                        self._resolve_synced(collection_name, load_error)
+                        await asyncio.sleep(self.sync_retry_delay)
+                        continue
+                    self._resolve_synced(collection_name)
+                    return
+                logger.warning(
+                    f"Could not resume the {collection_name} change stream, so the "
+                    f"collection will be reloaded: {e}",
+                )
+                resume_token = None
+                self._resolve_synced(collection_name, e)
+            except pymongo.errors.PyMongoError as e:
+                logger.warning(f"Lost the {collection_name} change stream: {e}")
+                self._resolve_synced(collection_name, e)
+            await asyncio.sleep(self.sync_retry_delay)
 
     async def delete(self, db_name: str, collection_name: str, iden: ObjectId) -> None:
         """
@@ -95,6 +319,48 @@ class MongoDatabase:
         """
         return await self.get_entire_collection("data", "cron")
 
+    async def create_cron_indexes(self) -> None:
+        """
+        Creates the indexes used to find due CRON tasks and the CRON tasks of a
+        user. Indexes which already exist are left as they are.
+        """
+        collection = self.client["data"]["cron"]
+        await collection.create_index([("time", ASCENDING)])
+        await collection.create_index([("type", ASCENDING), ("user", ASCENDING)])
+
+    async def get_due_cron(self, before: datetime.datetime) -> list[dict[str, Any]]:
+        """
+        Gets the CRON tasks which are due before a given time, earliest first.
+
+        Args:
+            before: The time to get the tasks due before.
+        """
+        collection = self.client["data"]["cron"]
+        cursor = collection.find({"time": {"$lt": before}}).sort("time", ASCENDING)
+        return [doc async for doc in cursor]
+
+    async def get_cron_task(self, doc_id: ObjectId) -> dict[str, Any] | None:
+        """
+        Gets a CRON task by its ID, or None if it no longer exists.
+        """
+        collection = self.client["data"]["cron"]
+        return await collection.find_one({"_id": doc_id})
+
+    async def get_user_cron(
+        self,
+        task_type: str,
+        user_id: int,
+    ) -> dict[str, Any] | None:
+        """
+        Gets a user's CRON task of a given type, or None if they have none.
+
+        Args:
+            task_type: The type of the task, such as ``UNSELFMUTE``.
+            user_id: The ID of the user the task is for.
+        """
+        collection = self.client["data"]["cron"]
+        return await collection.find_one({"type": task_type, "user": user_id})
+
     async def get_censor(self):
         """
         Gets the document containing censor information from the censor collection.
@@ -125,6 +391,18 @@ class MongoDatabase:
         """
         return await self.get_entire_collection("data", "events")
 
+    async def get_image_hashes(self):
+        """
+        Gets all documents in the image hashes collection.
+        """
+        return await self.get_entire_collection("data", "image_hashes")
+
+    async def get_webhooks(self):
+        """
+        Gets all documents in the webhooks collection.
+        """
+        return await self.get_entire_collection("data", "webhooks")
+
     async def get_settings(self):
         """
         Gets the one document containing settings information from the settings
@@ -145,6 +423,20 @@ class MongoDatabase:
         collection = self.client[db_name][collection_name]
         return await collection.insert_one(insert_dict)
 
+    async def replace(
+        self,
+        db_name: str,
+        collection_name: str,
+        document: dict[str, Any],
+    ) -> None:
+        """
+        Replaces the document with the same ID as the given document, inserting it
+        if no such document exists yet. Unlike :meth:`insert`, writing the same
+        document twice leaves a single copy.
+        """
+        collection = self.client[db_name][collection_name]
+        await collection.replace_one({"_id": document["_id"]}, document, upsert=True)
+
     async def update(
         self,
         db_name: str,
@@ -158,6 +450,152 @@ class MongoDatabase:
         collection = self.client[db_name][collection_name]
         await collection.update_one({"_id": doc_id}, update_dict)
 
+    def queue_update(
+        self,
+        db_name: str,
+        collection_name: str,
+        doc_id: ObjectId,
+        update_dict: dict[str, Any],
+    ) -> None:
+        """
+        Queues an update to a document, to be written together with other queued
+        updates shortly after. Updates to the same document are merged while they
+        wait. Await :meth:`flush` to wait until the update has been written.
+        """
+        self._enqueue(db_name, collection_name, doc_id, update_dict)
+        if self._pending_count >= self.write_batch_size:
+            self._flush_in_background()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                self.write_interval,
+                self._flush_in_background,
+            )
+
+    def _enqueue(
+        self,
+        db_name: str,
+        collection_name: str,
+        doc_id: ObjectId,
+        update_dict: dict[str, Any],
+    ) -> None:
+        operations = self._pending.setdefault((db_name, collection_name), [])
+        latest = self._latest.get((db_name, collection_name, doc_id))
+        merged = None
+        if latest is not None:
+            merged = merge_updates(operations[latest][1], update_dict)
+
+        if merged is not None:
+            operations[latest] = (doc_id, merged)
+        else:
+            self._latest[(db_name, collection_name, doc_id)] = len(operations)
+            operations.append((doc_id, update_dict))
+            self._pending_count += 1
+
+    def _requeue(
+        self,
+        db_name: str,
+        collection_name: str,
+        failed: list[tuple[Any, dict[str, Any]]],
+    ) -> None:
+        """
+        Queues updates which could not be written again, ahead of the updates
+        queued to the same collection since.
+        """
+        queued = self._pending.pop((db_name, collection_name), [])
+        self._pending_count -= len(queued)
+        for doc_id, _ in queued:
+            self._latest.pop((db_name, collection_name, doc_id), None)
+        for doc_id, update in failed + queued:
+            self._enqueue(db_name, collection_name, doc_id, update)
+
+    def _flush_in_background(self) -> None:
+        async def flush() -> None:
+            # Errors are already logged by flush
+            with contextlib.suppress(pymongo.errors.PyMongoError):
+                await self.flush()
+
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        task = asyncio.create_task(flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        """
+        Writes every queued update, in one bulk write per collection. Returns once
+        every update queued before the call has been written.
+
+        Updates which could not be written are queued again, and retried after a
+        delay which doubles with each failed flush. An update the database
+        rejects is skipped, as retrying it would fail again.
+
+        Raises:
+            pymongo.errors.PyMongoError: Some of the updates could not be written.
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        # Updates taken by a flush which is still writing are waited for too
+        async with self._write_lock:
+            pending, self._pending, self._latest = self._pending, {}, {}
+            self._pending_count = 0
+            error = None
+            for (db_name, collection_name), operations in pending.items():
+                collection = self.client[db_name][collection_name]
+                try:
+                    await collection.bulk_write(
+                        [
+                            UpdateOne({"_id": doc_id}, update)
+                            for doc_id, update in operations
+                        ],
+                        ordered=True,
+                    )
+                except pymongo.errors.BulkWriteError as e:
+                    write_errors = e.details.get("writeErrors")
+                    if not write_errors:
+                        # Only the write concern failed, so nothing was rejected
+                        logger.error(
+                            f"Could not confirm {len(operations)} queued updates to "
+                            f"the {collection_name} collection, retrying later: {e}",
+                        )
+                        self._requeue(db_name, collection_name, operations)
+                        error = e
+                        continue
+
+                    # The updates before the rejected one were written, and the
+                    # updates after it were not
+                    write_error = write_errors[0]
+                    index = write_error["index"]
+                    logger.error(
+                        f"Skipping queued update to document {operations[index][0]} "
+                        f"in the {collection_name} collection: {write_error['errmsg']}",
+                    )
+                    self._requeue(db_name, collection_name, operations[index + 1 :])
+                    error = e
+                except pymongo.errors.PyMongoError as e:
+                    logger.error(
+                        f"Could not write {len(operations)} queued updates to the "
+                        f"{collection_name} collection, retrying later: {e}",
+                    )
+                    self._requeue(db_name, collection_name, operations)
+                    error = e
+
+            if error is None:
+                self._write_failures = 0
+                return
+            self._write_failures += 1
+            if self._pending_count and self._flush_timer is None:
+                self._flush_timer = asyncio.get_running_loop().call_later(
+                    min(
+                        self.write_interval * 2**self._write_failures,
+                        self.write_retry_limit,
+                    ),
+                    self._flush_in_background,
+                )
+            raise error
+
     async def update_many(
         self,
         db_name: str,
@@ -0,0 +1,118 @@
+"""
+Computes perceptual hashes of images and indexes them for fast lookup by Hamming
+distance.
+
+Perceptual hashes of visually similar images (such as the same image resized or
+recompressed) differ in only a few bits, so known images can be found by searching
+for hashes within a small Hamming distance of the hash of a new image.
+"""
+
+from __future__ import annotations
+
+import io
+
+from PIL import Image
+
+HASH_SIZE = 8  # Hashes are HASH_SIZE * HASH_SIZE bits long
+
+
+def dhash(data: bytes) -> int:
+    """
+    Computes the difference hash of an image: each bit records whether a pixel is
+    brighter than the pixel to its right in a small grayscale copy of the image.
+
+    Args:
+        data: The raw bytes of the image file.
+
+    Raises:
+        PIL.UnidentifiedImageError: The data is not a supported image.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        # Allows JPEG images to be decoded at a reduced size, which is much faster
+        image.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4))
+        small = image.convert("L").resize(
+            (HASH_SIZE + 1, HASH_SIZE),
+            Image.Resampling.LANCZOS,
+        )
+        pixels = list(small.getdata())
+
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """
+    Returns the number of bits which differ between two hashes.
+    """
+    return (first ^ second).bit_count()
+
+
+class BKTree:
+    """
+    A Burkhard-Keller tree of hashes, which finds all hashes within a Hamming
+    distance of a query without comparing against every hash in the tree.
+
+    Each node stores a hash and its children keyed by their distance to that hash.
+    By the triangle inequality, only children whose key is within the query
+    distance of the query's own distance to the node can contain a match.
+    """
+
+    def __init__(self, values: list[int] | None = None):
+        self._root: tuple[int, dict[int, tuple]] | None = None
+        self._size = 0
+        for value in values or []:
+            self.add(value)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int) -> None:
+        """
+        Adds a hash to the tree. Hashes already in the tree are ignored.
+        """
+        if self._root is None:
+            self._root = (value, {})
+            self._size += 1
+            return
+
+        node = self._root
+        while True:
+            node_value, children = node
+            distance = hamming_distance(value, node_value)
+            if distance == 0:
+                return
+            if distance not in children:
+                children[distance] = (value, {})
+                self._size += 1
+                return
+            node = children[distance]
+
+    def search(self, value: int, max_distance: int) -> list[int]:
+        """
+        Returns all hashes in the tree within a Hamming distance of a hash.
+
+        Args:
+            value: The hash to search for.
+            max_distance: The largest Hamming distance to consider a match.
+        """
+        if self._root is None:
+            return []
+
+        matches = []
+        candidates = [self._root]
+        while candidates:
+            node_value, children = candidates.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                matches.append(node_value)
+            candidates.extend(
+                child
+                for child_distance, child in children.items()
+                if distance - max_distance <= child_distance <= distance + max_distance
+            )
+        return matches
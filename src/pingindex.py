@@ -0,0 +1,140 @@
+"""
+Indexes every member's pings, so that a message is checked against all pings in
+one pass over its words.
+
+Most pings are plain words or phrases. These are stored in a hash index keyed by
+their first word, so each word of a message is looked up once, no matter how many
+pings exist. Pings using regular expression syntax cannot be indexed by word, and
+are kept in a separate list to be evaluated in the regex pool.
+
+Every ping is compiled once, when it is added to the index, and the compiled
+pattern is kept for matching and for highlighting pings in alerts. Only plain
+pings are highlighted outside the regex pool.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Iterable
+
+from src.features import TOKEN_PATTERN, normalize
+from src.store import PingSubscriber
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# Pings made up only of words separated by whitespace
+PLAIN_PING = re.compile(r"\w+(?:\s+\w+)*")
+
+
+def ping_pattern(ping: str) -> re.Pattern[str]:
+    """
+    Compiles a ping into the expression used to find it in messages.
+
+    Raises:
+        re.error: The ping is not a valid regular expression.
+    """
+    return re.compile(rf"\b({ping})\b", re.I)
+
+
+def nested_quantifiers(ping: str) -> bool:
+    """
+    Returns whether a ping repeats something which is itself repeated without a
+    limit, such as ``(a+)+``. Expressions like this can take exponential time to
+    fail to match.
+    """
+    repeats = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+    def walk(items, in_repeat: bool) -> bool:
+        for op, av in items:
+            if op in repeats:
+                unbounded = av[1] == sre_parse.MAXREPEAT
+                if (unbounded and in_repeat) or walk(av[2], in_repeat or unbounded):
+                    return True
+            elif op == sre_parse.SUBPATTERN:
+                if walk(av[-1], in_repeat):
+                    return True
+            elif op == sre_parse.BRANCH:
+                if any(walk(branch, in_repeat) for branch in av[1]):
+                    return True
+            elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                if walk(av[1], in_repeat):
+                    return True
+        return False
+
+    return walk(sre_parse.parse(ping), False)
+
+
+def ping_tokens(ping: str) -> tuple[str, ...] | None:
+    """
+    Returns the folded words of a plain word or phrase ping, in the same form as
+    :attr:`src.features.MessageFeatures.tokens`, or None if the ping uses regular
+    expression syntax.
+    """
+    if not PLAIN_PING.fullmatch(ping.strip()):
+        return None
+    return tuple(TOKEN_PATTERN.findall(normalize(ping).casefold()))
+
+
+class PingIndex:
+    """
+    An index of the pings of every member.
+    """
+
+    words: dict[str, list[tuple[int, str, tuple[str, ...]]]]
+    expressions: list[tuple[int, str, re.Pattern[str]]]
+    patterns: dict[int, list[re.Pattern[str]]]
+
+    def __init__(self, ping_info: Iterable[PingSubscriber] = ()):
+        # The first word of each plain ping, mapped to the user ID, the ping and
+        # the remaining words of the ping
+        self.words = {}
+        # The user ID, ping and pattern of each ping using regular expression syntax
+        self.expressions = []
+        # The patterns of each user's plain word and phrase pings
+        self.patterns = {}
+        for user in ping_info:
+            for ping in user.word_pings:
+                self.add(user.user_id, ping)
+
+    def add(self, user_id: int, ping: str) -> None:
+        """
+        Adds a member's ping to the index. Pings which are not valid expressions
+        are skipped.
+        """
+        try:
+            pattern = ping_pattern(ping)
+        except re.error as e:
+            logger.warning(f"Skipping invalid ping {ping!r} of user {user_id}: {e}")
+            return
+        tokens = ping_tokens(ping)
+
+        # Pings using regular expression syntax may be slow to match, so they are
+        # only evaluated in the regex pool
+        if tokens:
+            self.patterns.setdefault(user_id, []).append(pattern)
+            self.words.setdefault(tokens[0], []).append((user_id, ping, tokens[1:]))
+        else:
+            self.expressions.append((user_id, ping, pattern))
+
+    def match_words(self, tokens: list[str]) -> set[tuple[int, str]]:
+        """
+        Finds the plain word and phrase pings found in a message.
+
+        Args:
+            tokens: The folded words of the message.
+
+        Returns:
+            The user ID and ping of every matching ping.
+        """
+        matches = set()
+        for i, token in enumerate(tokens):
+            for user_id, ping, rest in self.words.get(token, ()):
+                if not rest or tuple(tokens[i + 1 : i + 1 + len(rest)]) == rest:
+                    matches.add((user_id, ping))
+        return matches
@@ -0,0 +1,298 @@
+"""
+Evaluates regular expressions in a small pool of worker processes.
+
+Regular expressions supplied by staff and members (such as censored words and
+pings) can backtrack catastrophically on some inputs. Running them in a thread
+does not help, as a thread cannot be stopped once it has started. Instead, each
+expression is evaluated in a worker process, and workers which go over their time
+budget are killed and replaced, immediately freeing the CPU.
+
+Workers are started with ``python -m src.regexpool`` and receive one JSON-encoded
+operation per line on stdin, answering with one JSON-encoded result per line on
+stdout. This module only depends on the standard library, so that workers start
+quickly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import logging
+import pathlib
+import re
+import sys
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIRECTORY = pathlib.Path(__file__).resolve().parents[1]
+STREAM_LIMIT = 16 * 1024 * 1024
+
+# Patterns compiled inside a worker process, keyed by their source and flags, with
+# the most recently used last
+_compiled: collections.OrderedDict[tuple, re.Pattern[str]] = collections.OrderedDict()
+_COMPILED_LIMIT = 1024
+
+
+def _compile(pattern: str, flags: int) -> re.Pattern[str]:
+    key = (pattern, flags)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compiled[key] = re.compile(pattern, flags)
+        if len(_compiled) > _COMPILED_LIMIT:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(key)
+    return compiled
+
+
+def _search(pattern: str, flags: int, text: str) -> bool:
+    return _compile(pattern, flags).search(text) is not None
+
+
+def _sub(pattern: str, flags: int, repl: str, text: str) -> str:
+    return _compile(pattern, flags).sub(repl, text)
+
+
+def _spans(pattern: str, flags: int, text: str) -> list[tuple[int, int]]:
+    return [
+        m.span() for m in _compile(pattern, flags).finditer(text) if m.end() > m.start()
+    ]
+
+
+def _search_many(pattern: str, flags: int, texts: list[str]) -> list[int]:
+    compiled = _compile(pattern, flags)
+    return [i for i, text in enumerate(texts) if compiled.search(text) is not None]
+
+
+def _match_many(patterns: list[tuple[str, int]], text: str) -> list[bool | None]:
+    results = []
+    for pattern, flags in patterns:
+        try:
+            results.append(_compile(pattern, flags).search(text) is not None)
+        except re.error:
+            results.append(None)
+    return results
+
+
+def _backtest(
+    pattern: str,
+    flags: int,
+    texts: list[str],
+    samples: int,
+) -> dict[str, Any]:
+    compiled = _compile(pattern, flags)
+    costs = []
+    hits = []
+    for i, text in enumerate(texts):
+        start = time.perf_counter_ns()
+        found = compiled.search(text) is not None
+        costs.append(time.perf_counter_ns() - start)
+        if found:
+            hits.append(i)
+    costs.sort()
+    return {
+        "hits": len(hits),
+        "samples": hits[:samples],
+        "p50_ns": costs[len(costs) // 2] if costs else 0,
+        "p99_ns": costs[int(len(costs) * 0.99)] if costs else 0,
+    }
+
+
+OPERATIONS = {
+    "search": _search,
+    "sub": _sub,
+    "spans": _spans,
+    "search_many": _search_many,
+    "match_many": _match_many,
+    "backtest": _backtest,
+}
+
+
+def _worker_main() -> None:
+    """
+    Entry point of a worker process. Answers operations until stdin is closed.
+    """
+    for line in sys.stdin.buffer:
+        operation, args = json.loads(line)
+        try:
+            response = [True, OPERATIONS[operation](*args)]
+        except Exception as e:
+            response = [False, repr(e)]
+        sys.stdout.buffer.write(json.dumps(response).encode() + b"\n")
+        sys.stdout.buffer.flush()
+
+
+class RegexPoolError(Exception):
+    """
+    Raised when a worker fails to evaluate an operation.
+    """
+
+
+class RegexPoolBusy(RegexPoolError):
+    """
+    Raised when an operation could not be given its full time budget, because no
+    worker was free to run it in time. Unlike :class:`asyncio.TimeoutError`, this
+    says nothing about the operation itself.
+    """
+
+
+class RegexPool:
+    """
+    A size-limited pool of processes for evaluating regular expressions with a
+    hard time budget.
+
+    Counters for completed operations, timeouts, errors, worker restarts and
+    operations which found no free worker are kept in :attr:`stats`.
+    """
+
+    size: int
+    timeout: float
+    stats: collections.Counter[str]
+
+    restart_delay = 5  # The number of seconds before a failed worker start is retried
+
+    def __init__(self, size: int = 2, timeout: float = 1.5):
+        self.size = size
+        self.timeout = timeout
+        self.stats = collections.Counter()
+        self._idle: asyncio.Queue[asyncio.subprocess.Process] = asyncio.Queue()
+        self._workers: set[asyncio.subprocess.Process] = set()
+        self._restarts: set[asyncio.Task] = set()
+
+    async def _spawn(self) -> None:
+        worker = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            __name__,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=ROOT_DIRECTORY,
+            limit=STREAM_LIMIT,
+        )
+        self._workers.add(worker)
+        self._idle.put_nowait(worker)
+
+    async def _restart(self, worker: asyncio.subprocess.Process) -> None:
+        await worker.wait()
+        self.stats["restarts"] += 1
+        # The pool would stay smaller if the new worker were given up on
+        while True:
+            try:
+                await self._spawn()
+                return
+            except OSError as e:
+                logger.error(f"Could not start a regex worker, retrying: {e}")
+                await asyncio.sleep(self.restart_delay)
+
+    def _replace(self, worker: asyncio.subprocess.Process) -> None:
+        """
+        Kills a worker which can no longer be trusted, and starts a new one in
+        its place.
+        """
+        self._workers.discard(worker)
+        if worker.returncode is None:
+            worker.kill()
+        task = asyncio.create_task(self._restart(worker))
+        self._restarts.add(task)
+        task.add_done_callback(self._restarts.discard)
+
+    async def start(self) -> None:
+        """
+        Starts all worker processes.
+        """
+        for _ in range(self.size - len(self._workers)):
+            await self._spawn()
+        logger.info(f"Started regex pool with {self.size} workers.")
+
+    async def close(self) -> None:
+        """
+        Stops all worker processes.
+        """
+        for task in self._restarts:
+            task.cancel()
+        for worker in self._workers:
+            if worker.returncode is None:
+                worker.kill()
+            await worker.wait()
+        self._workers.clear()
+        self._idle = asyncio.Queue()
+
+    async def run(self, operation: str, *args: Any, timeout: float | None = None):
+        """
+        Runs an operation in a worker process.
+
+        Args:
+            operation: The name of the operation to run.
+            *args: The arguments to the operation.
+            timeout: The time budget of the operation, in seconds. Defaults to
+                the timeout of the pool.
+
+        Raises:
+            asyncio.TimeoutError: The operation went over its full time budget.
+                The worker running it was killed and replaced.
+            RegexPoolBusy: No worker was free, so the operation either never
+                started or ran out of time after waiting for a worker. The whole
+                call never takes longer than the time budget.
+            RegexPoolError: The operation raised an exception in the worker, or
+                the worker could not be reached.
+
+        Returns:
+            The result of the operation.
+        """
+        loop = asyncio.get_running_loop()
+        budget = timeout or self.timeout
+        deadline = loop.time() + budget
+        waited = self._idle.empty()
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), budget)
+        except asyncio.TimeoutError:
+            self.stats["busy"] += 1
+            logger.warning(f"No regex worker was free to run {operation!r}.")
+            raise RegexPoolBusy("No worker was free.") from None
+        assert worker.stdin is not None and worker.stdout is not None
+        try:
+            worker.stdin.write(json.dumps([operation, args]).encode() + b"\n")
+            await worker.stdin.drain()
+            line = await asyncio.wait_for(
+                worker.stdout.readline(),
+                deadline - loop.time(),
+            )
+            if not line:
+                raise RegexPoolError("Worker exited unexpectedly.")
+            success, result = json.loads(line)
+        except asyncio.TimeoutError:
+            self._replace(worker)
+            if waited:
+                # Part of the budget was spent waiting, so the operation itself
+                # cannot be blamed
+                self.stats["busy"] += 1
+                logger.warning(
+                    f"Regex operation {operation!r} ran out of time after waiting "
+                    "for a worker.",
+                )
+                raise RegexPoolBusy("Ran out of time waiting for a worker.") from None
+            self.stats["timeouts"] += 1
+            logger.warning(f"Regex operation {operation!r} went over its time budget.")
+            raise
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.stats["errors"] += 1
+            self._replace(worker)
+            raise RegexPoolError(f"Could not reach worker: {e!r}") from e
+        except BaseException:
+            # The worker may still be busy or gone, so it cannot be reused
+            self._replace(worker)
+            raise
+
+        self._idle.put_nowait(worker)
+        if not success:
+            self.stats["errors"] += 1
+            raise RegexPoolError(result)
+        self.stats["completed"] += 1
+        return result
+
+
+if __name__ == "__main__":
+    _worker_main()
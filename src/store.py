@@ -0,0 +1,343 @@
+"""
+Keeps the documents of the bot's data collections in memory, indexed for
+constant-time lookups.
+
+Each document is loaded into a record with a fixed set of attributes. A
+collection indexes its records by document ID and by a natural key, such as a
+member's user ID or a tag's name, and counts every change in a version number.
+Caches built from a collection, like the ping index, remember the version they
+were built from and rebuild once it no longer matches.
+"""
+
+from __future__ import annotations
+
+import copy
+from collections.abc import Iterable, Iterator
+from typing import Any, ClassVar, Generic, TypeVar
+
+
+class Record:
+    """
+    A document from one of the data collections.
+
+    Fields missing from the document take their defaults. Fields the record does
+    not know about are kept aside, so converting the record back into a document
+    loses nothing.
+    """
+
+    __slots__ = ("_id", "extra")
+
+    # The fields of the record, mapped to their defaults
+    fields: ClassVar[dict[str, Any]] = {}
+
+    _id: Any
+    extra: dict[str, Any]
+
+    def __init__(self, **values: Any):
+        self._id = values.pop("_id", None)
+        for field, default in self.fields.items():
+            setattr(self, field, values.pop(field, copy.copy(default)))
+        self.extra = values
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.fields)
+        return f"{type(self).__name__}(_id={self._id!r}, {fields})"
+
+    @classmethod
+    def from_document(cls, document: dict[str, Any]) -> Record:
+        return cls(**document)
+
+    def to_document(self) -> dict[str, Any]:
+        """
+        Returns the record as a document which can be stored in the database.
+        """
+        document = dict(self.extra)
+        if self._id is not None:
+            document["_id"] = self._id
+        document.update((field, getattr(self, field)) for field in self.fields)
+        return document
+
+
+class PingSubscriber(Record):
+    """
+    A member's pings, from the ``pings`` collection.
+    """
+
+    __slots__ = ("user_id", "word_pings", "dnd", "digest")
+    fields: ClassVar[dict[str, Any]] = {
+        "user_id": 0,
+        "word_pings": [],
+        "dnd": False,
+        "digest": False,
+    }
+
+    user_id: int
+    word_pings: list[str]
+    dnd: bool
+    digest: bool
+
+
+class Tag(Record):
+    """
+    A tag members can send with /tag, from the ``tags`` collection.
+    """
+
+    __slots__ = ("name", "output", "permissions")
+    fields: ClassVar[dict[str, Any]] = {
+        "name": "",
+        "output": "",
+        "permissions": {"staff": True, "launch_helpers": True, "members": True},
+    }
+
+    name: str
+    output: str
+    permissions: dict[str, bool]
+
+
+class Event(Record):
+    """
+    A Science Olympiad event members can add as a role, from the ``events``
+    collection.
+    """
+
+    __slots__ = ("name", "aliases", "emoji")
+    fields: ClassVar[dict[str, Any]] = {"name": "", "aliases": [], "emoji": None}
+
+    name: str
+    aliases: list[str]
+    emoji: str | None
+
+
+class Report(Record):
+    """
+    A report sent to staff, from the ``reports`` collection. Reports of
+    inappropriate names have the ``username`` type, and record the member and
+    name reported.
+    """
+
+    __slots__ = ("type", "user", "name")
+    fields: ClassVar[dict[str, Any]] = {"type": None, "user": None, "name": None}
+
+    type: str | None
+    user: int | None
+    name: str | None
+
+
+R = TypeVar("R", bound=Record)
+
+
+class Collection(Generic[R]):
+    """
+    The records of one data collection, indexed by document ID and by a natural
+    key. Every change to the collection increases its version.
+
+    Records should only be changed through the collection, so that its indexes
+    and version stay up to date.
+    """
+
+    record: type[R]
+    key: str
+    version: int
+
+    def __init__(self, record: type[R], key: str):
+        self.record = record
+        self.key = key
+        self.version = 0
+        self._records: dict[Any, R] = {}
+        self._ids: dict[Any, R] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[R]:
+        return iter(self._records.values())
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._records
+
+    def get(self, key: Any) -> R | None:
+        """
+        Returns the record with the given natural key, or None if there is none.
+        """
+        return self._records.get(key)
+
+    def get_by_id(self, _id: Any) -> R | None:
+        """
+        Returns the record with the given document ID, or None if there is none.
+        """
+        return self._ids.get(_id)
+
+    def _index(self, record: R) -> None:
+        # A record can only be found by one natural key, so any other record
+        # with the same key is replaced
+        replaced = self._records.get(getattr(record, self.key))
+        if replaced is not None:
+            self._unindex(replaced)
+        self._records[getattr(record, self.key)] = record
+        if record._id is not None:
+            self._ids[record._id] = record
+
+    def _unindex(self, record: R) -> None:
+        self._records.pop(getattr(record, self.key), None)
+        if record._id is not None:
+            self._ids.pop(record._id, None)
+
+    def load(self, documents: Iterable[dict[str, Any]]) -> None:
+        """
+        Replaces every record in the collection with records of the given
+        documents. If several documents share a natural key, the last one is kept.
+        """
+        self._records = {}
+        self._ids = {}
+        for document in documents:
+            self._index(self.record.from_document(document))
+        self.version += 1
+
+    def add(self, record: R) -> None:
+        """
+        Adds a record to the collection.
+
+        Raises:
+            KeyError: A record with the same natural key is already in the
+                collection.
+        """
+        key = getattr(record, self.key)
+        if key in self._records:
+            raise KeyError(key)
+        self._index(record)
+        self.version += 1
+
+    def update(self, key: Any, **values: Any) -> R:
+        """
+        Changes the fields of the record with the given natural key.
+
+        Raises:
+            KeyError: No record has the given natural key.
+
+        Returns:
+            The changed record.
+        """
+        record = self._records[key]
+        self._unindex(record)
+        for field, value in values.items():
+            setattr(record, field, value)
+        self._index(record)
+        self.version += 1
+        return record
+
+    def remove(self, key: Any) -> R | None:
+        """
+        Removes the record with the given natural key.
+
+        Returns:
+            The removed record, or None if no record had the key.
+        """
+        record = self._records.get(key)
+        if record is None:
+            return None
+        self._unindex(record)
+        self.version += 1
+        return record
+
+    def apply_change(self, change: dict[str, Any]) -> None:
+        """
+        Applies an event from a change stream of the collection, opened with the
+        full document looked up for updates.
+
+        Changes which leave the records as they are, such as the bot's own writes,
+        do not increase the version.
+        """
+        operation = change["operationType"]
+        if operation not in ("insert", "update", "replace", "delete"):
+            return
+        current = self._ids.get(change["documentKey"]["_id"])
+
+        if operation == "delete":
+            if current is None:
+                return
+            self._unindex(current)
+        else:
+            document = change.get("fullDocument")
+            if document is None:
+                return  # The document was deleted since, and its delete follows
+            record = self.record.from_document(document)
+            if current is not None:
+                if current.to_document() == record.to_document():
+                    return
+                self._unindex(current)
+            self._index(record)
+        self.version += 1
+
+
+class CensorList:
+    """
+    The words, emojis and domains on the censor list, from the one document of
+    the ``censor`` collection. Every change to the list increases its version.
+    """
+
+    __slots__ = ("_id", "words", "emojis", "domains", "version")
+
+    kinds = ("words", "emojis", "domains")
+
+    _id: Any
+    words: set[str]
+    emojis: set[str]
+    domains: set[str]
+    version: int
+
+    def __init__(self):
+        self._id = None
+        self.words = set()
+        self.emojis = set()
+        self.domains = set()
+        self.version = 0
+
+    def load(self, document: dict[str, Any] | None) -> None:
+        """
+        Replaces the censor list with the contents of its document.
+        """
+        document = document or {}
+        self._id = document.get("_id")
+        for kind in self.kinds:
+            setattr(self, kind, set(document.get(kind, [])))
+        self.version += 1
+
+    def add(self, kind: str, value: str) -> None:
+        """
+        Adds a word, emoji or domain to the censor list.
+
+        Args:
+            kind: ``words``, ``emojis`` or ``domains``.
+            value: The entry to add.
+        """
+        getattr(self, kind).add(value)
+        self.version += 1
+
+    def remove(self, kind: str, value: str) -> None:
+        """
+        Removes a word, emoji or domain from the censor list, if it is on it.
+
+        Args:
+            kind: ``words``, ``emojis`` or ``domains``.
+            value: The entry to remove.
+        """
+        getattr(self, kind).discard(value)
+        self.version += 1
+
+    def apply_change(self, change: dict[str, Any]) -> None:
+        """
+        Applies an event from a change stream of the ``censor`` collection, opened
+        with the full document looked up for updates.
+        """
+        operation = change["operationType"]
+        if operation == "delete" and change["documentKey"]["_id"] == self._id:
+            self.load(None)
+            return
+        document = change.get("fullDocument")
+        if operation not in ("insert", "update", "replace") or document is None:
+            return
+        if document.get("_id") == self._id and all(
+            set(document.get(kind, [])) == getattr(self, kind) for kind in self.kinds
+        ):
+            return
+        self.load(document)
@@ -0,0 +1,17 @@
+"""
+Shared setup for the test suite. The settings in env.py are required at import
+time, so placeholder values are set before any bot module is imported.
+"""
+
+import os
+
+for name, value in {
+    "DISCORD_TOKEN": "token",
+    "DISCORD_DEV_TOKEN": "token",
+    "DEV_SERVER_ID": "1",
+    "STATES_SERVER_ID": "1",
+    "SLASH_COMMAND_GUILDS": "1",
+    "EMOJI_GUILDS": "1",
+    "MONGO_URL": "mongodb://localhost",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,60 @@
+"""
+Tests for the spam checks run on every message.
+"""
+
+import asyncio
+from unittest import mock
+
+import discord
+
+from src.discord.spam import SpamManager
+from src.features import MessageFeatures
+from src.minhash import minhash, similarity
+
+
+def make_message(content: str, author_id: int = 1) -> mock.MagicMock:
+    author = mock.MagicMock(spec=discord.Member)
+    author.id = author_id
+    author.bot = False
+    author.send = mock.AsyncMock()
+    message = mock.MagicMock(spec=discord.Message)
+    message.author = author
+    message.content = content
+    message.channel.id = 10
+    message.channel.send = mock.AsyncMock()
+    return message
+
+
+def make_spam_manager() -> SpamManager:
+    bot = mock.MagicMock()
+    bot.settings = {}
+    return SpamManager(bot)
+
+
+def test_minhash_of_similar_text():
+    text = "Is anyone going to the regional tournament this weekend?"
+    assert minhash(text) == minhash(text)
+    assert similarity(minhash(text), minhash(text + "!")) > 0.6
+    assert similarity(minhash(text), minhash("Completely unrelated words")) < 0.2
+
+
+def test_spam_checks_on_long_message():
+    spam = make_spam_manager()
+    message = make_message("Is anyone going to the regional tournament this weekend?")
+
+    features = MessageFeatures.build(message.content)
+    asyncio.run(spam.store_and_validate(message, features))
+
+    message.author.send.assert_not_awaited()
+    assert len(spam.similar_messages) == 1
+
+
+def test_repeated_long_messages_are_warned():
+    spam = make_spam_manager()
+    for suffix in ("", "!", "?"):
+        message = make_message(f"Join my server for free nitro right now{suffix}")
+        asyncio.run(
+            spam.store_and_validate(message, MessageFeatures.build(message.content)),
+        )
+
+    message.author.send.assert_awaited_once()